@@ -0,0 +1,161 @@
+"""
+Defines the synthetic agents and data used by the benchmarks
+"""
+
+from typing import Dict, List
+
+from bson import ObjectId
+from pymongo import MongoClient
+
+from constants.model_providers import LLMModel
+from models.agent import Agent
+from models.node.input import InputNode
+from models.node.llm import LLMModelSettings, LLMNode
+from models.node.main import BaseNode, NodeType, Output
+from models.node.prompt import PromptNode
+from utils.enum import Mongo as MongoEnum
+
+# Model of the synthetic llm nodes. Its latency and errors are set with the
+# LOCAL_FAKE_* variables
+BENCHMARK_MODEL: LLMModel = LLMModel.LOCAL_FAKE
+
+
+def synthetic_agent(size: int, project_id: str = "benchmark") -> Agent:
+    """
+    Builds an agent with `size` nodes: an input node fanned out to parallel
+    prompt and llm branches, joined by a final prompt node
+
+    The graph is 4 supersteps deep whatever its size, so large agents stay
+    below the LangGraph recursion limit.
+
+    Args:
+        - size: Number of nodes. At least 4, rounded down to an even number
+        - project_id: Identifier of the project of the agent
+    """
+    agent_id: str = str(ObjectId())
+    branches: int = max(1, (size - 2) // 2)
+
+    join: PromptNode = PromptNode(
+        _id=ObjectId(),
+        type=NodeType.prompt,
+        name="summary",
+        agent_id=agent_id,
+        end=True,
+        join=True,
+        prompt=" ".join(f"{{answer_{branch}}}" for branch in range(branches)),
+        version="1",
+        inputs=[f"answer_{branch}" for branch in range(branches)],
+        output=Output(name="summary", type=Output.Type.str),
+    )
+    prompts: List[PromptNode] = []
+    llms: List[LLMNode] = []
+    for branch in range(branches):
+        llm: LLMNode = LLMNode(
+            _id=ObjectId(),
+            type=NodeType.llm,
+            name=f"llm_{branch}",
+            agent_id=agent_id,
+            target_id=str(join.id),
+            model=LLMModelSettings(name=BENCHMARK_MODEL, temperature=0),
+            input=f"prompt_{branch}",
+            output=Output(name=f"answer_{branch}", type=Output.Type.str),
+        )
+        prompts.append(
+            PromptNode(
+                _id=ObjectId(),
+                type=NodeType.prompt,
+                name=f"prompt_{branch}",
+                agent_id=agent_id,
+                target_id=str(llm.id),
+                prompt=f"Branch {branch}: write about {{topic}}",
+                version="1",
+                inputs=["topic"],
+                output=Output(name=f"prompt_{branch}", type=Output.Type.str),
+            )
+        )
+        llms.append(llm)
+
+    topic: InputNode = InputNode(
+        _id=ObjectId(),
+        type=NodeType.input,
+        name="topic",
+        agent_id=agent_id,
+        start=True,
+        target_ids=[str(prompt.id) for prompt in prompts],
+        value="benchmarks",
+        output=Output(name="topic", type=Output.Type.str),
+    )
+
+    return Agent(
+        _id=ObjectId(agent_id),
+        name=f"benchmark_{size}",
+        description=f"Synthetic agent with {size} nodes",
+        project_id=project_id,
+        nodes=[topic, *prompts, *llms, join],
+    )
+
+
+def seed(client: MongoClient, sizes: List[int]) -> Dict[int, Agent]:
+    """
+    Inserts one project per size, with a synthetic agent of that size
+
+    Documents are inserted directly rather than through the repositories, so
+    seeding 1000 nodes does not take 1000 round trips.
+
+    Args:
+        - client: MongoDB client
+        - sizes: Number of nodes of each agent
+
+    Returns:
+        - Agents keyed by size
+    """
+    database = client[MongoEnum.Database.AGENT_00]
+    agents: Dict[int, Agent] = {}
+    for size in sizes:
+        project_id: ObjectId = ObjectId()
+        agent: Agent = synthetic_agent(size, str(project_id))
+        nodes: List[BaseNode] = agent.nodes
+
+        database[MongoEnum.Collection.NODES].insert_many(
+            [
+                {"_id": ObjectId(node.id), **node.model_dump(exclude={"id"})}
+                for node in nodes
+            ]
+        )
+        database[MongoEnum.Collection.AGENTS].insert_one(
+            {
+                "_id": ObjectId(agent.id),
+                "name": agent.name,
+                "description": agent.description,
+                "project_id": agent.project_id,
+                "nodes": [str(node.id) for node in nodes],
+            }
+        )
+        database[MongoEnum.Collection.PROJECTS].insert_one(
+            {
+                "_id": project_id,
+                "name": f"benchmark_{size}",
+                "description": "Benchmarks",
+                "agents": [str(agent.id)],
+            }
+        )
+        agents[size] = agent
+
+    return agents
+
+
+def unseed(client: MongoClient, agents: Dict[int, Agent]) -> None:
+    """
+    Deletes the documents inserted by seed
+
+    Args:
+        - client: MongoDB client
+        - agents: Seeded agents
+    """
+    database = client[MongoEnum.Database.AGENT_00]
+    for agent in agents.values():
+        database[MongoEnum.Collection.NODES].delete_many({"agent_id": str(agent.id)})
+        database[MongoEnum.Collection.AGENTS].delete_one({"_id": ObjectId(agent.id)})
+        database[MongoEnum.Collection.PROJECTS].delete_one(
+            {"_id": ObjectId(agent.project_id)}
+        )
@@ -0,0 +1,104 @@
+"""
+Checks the import time of CLI commands against a budget
+
+Run it from the backend directory:
+
+    python benchmarks/importtime.py
+
+Exits with status 1 when a command exceeds its budget or imports a module
+that only its subcommands should need. Budgets can be scaled for slower
+machines with IMPORT_BUDGET_SCALE (e.g. 2).
+"""
+
+from typing import Dict, List, Tuple
+import os
+import subprocess
+import sys
+
+BACKEND: str = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Heavy dependencies that are only needed when running agents, serving them or
+# visualizing them
+HEAVY: Tuple[str, ...] = (
+    "langchain",
+    "langchain_core",
+    "langchain_openai",
+    "langgraph.graph",
+    "langgraph.pregel",
+    "langgraph.checkpoint",
+    "motor",
+    "PIL",
+    "fastapi",
+    "uvicorn",
+)
+
+# Command, budget in milliseconds
+COMMANDS: List[Tuple[List[str], int]] = [
+    (["--help"], 150),
+    (["project", "read", "--help"], 800),
+    (["agent", "read", "--help"], 800),
+    (["node", "input", "read", "--help"], 800),
+    (["job", "stats", "--help"], 800),
+    (["db", "migrate", "--help"], 800),
+]
+
+
+def measure(command: List[str]) -> Dict[str, int]:
+    """
+    Imports of a command, as reported by python -X importtime
+
+    Args:
+        - command: Arguments of cli.py
+
+    Returns:
+        - Self import time in microseconds per module
+    """
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "cli.py", *command],
+        cwd=BACKEND,
+        capture_output=True,
+        text=True,
+    )
+    if process.returncode != 0:
+        raise RuntimeError(f"cli.py {' '.join(command)} failed: {process.stderr}")
+
+    imports: Dict[str, int] = {}
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_time, _, module = line[len("import time:") :].split("|")
+        imports[module.strip()] = int(self_time)
+
+    return imports
+
+
+def main() -> int:
+    scale: float = float(os.getenv("IMPORT_BUDGET_SCALE", 1))
+    failed: bool = False
+
+    for command, budget in COMMANDS:
+        imports: Dict[str, int] = measure(command)
+        total: float = sum(imports.values()) / 1000
+        limit: float = budget * scale
+        heavy: List[str] = sorted(
+            module
+            for module in imports
+            if any(module == name or module.startswith(f"{name}.") for name in HEAVY)
+        )
+
+        status: str = "ok" if total <= limit and not heavy else "FAIL"
+        failed = failed or status == "FAIL"
+        print(f"{status:4} {' '.join(command):28} {total:7.1f}ms / {limit:.0f}ms")
+
+        if heavy:
+            print(f"     imports {', '.join(heavy[:5])}")
+        if status == "FAIL":
+            slowest = sorted(imports.items(), key=lambda item: item[1], reverse=True)
+            for module, self_time in slowest[:5]:
+                print(f"     {self_time / 1000:7.1f}ms {module}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,351 @@
+"""
+Benchmarks graph build, repository reads and run throughput
+
+Run it from the backend directory:
+
+    python -m benchmarks.main
+    python -m benchmarks.main --save  # Stores the results as the baseline
+
+Agents are synthetic (see benchmarks.agents) and llm nodes use the local-fake
+model, so no provider is called. Set LOCAL_FAKE_LATENCY_MS and friends to
+simulate provider latency and errors. Repositories are benchmarked
+against mongomock, or against the MongoDB server at --mongodb-uri. Seeded
+documents are deleted afterwards.
+
+Results are compared with the stored baseline. The command exits with status
+1 when a benchmark is slower, or uses more memory, than the baseline by more
+than --threshold.
+"""
+
+from datetime import datetime, timezone
+from time import perf_counter
+from types import SimpleNamespace
+from typing import Annotated, Any, Callable, Dict, List, Union
+import asyncio
+import json
+import os
+import platform
+import tracemalloc
+
+# Logs of every node execution would dominate the timings
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+from bson import ObjectId
+from pymongo import MongoClient
+from rich import print
+from rich.table import Table
+import typer
+
+from benchmarks.agents import seed, synthetic_agent, unseed
+from models.agent import Agent
+from repositories.agent import AgentRepository
+from repositories.project import ProjectRepository
+from utils.enum import Mongo as MongoEnum
+from utils.logger import LOGGER
+from utils.mongodb_client import get_client_settings
+
+BASELINE: str = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+# Units where a higher value is better
+HIGHER_IS_BETTER: List[str] = ["runs/s"]
+
+app = typer.Typer(add_completion=False)
+
+
+def measure(
+    func: Callable[[], Any], unit: str, min_time: float, operations: int = 1
+) -> Dict:
+    """
+    Times a function until it ran for min_time and at least 3 rounds, then
+    runs it once more under tracemalloc to record its peak memory
+
+    Args:
+        - func: Function to benchmark
+        - unit: "ms" per call, or "runs/s" for operations per second
+        - min_time: Seconds to spend timing
+        - operations: Operations done by each call, for throughputs
+
+    Returns:
+        - Median, best and worst values, rounds and peak memory in KiB
+    """
+    func()  # Warm up caches and connections
+
+    samples: List[float] = []
+    started: float = perf_counter()
+    while len(samples) < 3 or perf_counter() - started < min_time:
+        start: float = perf_counter()
+        func()
+        samples.append(perf_counter() - start)
+
+    tracemalloc.start()
+    func()
+    peak: int = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+    samples.sort()
+    values: List[float] = (
+        [operations / sample for sample in reversed(samples)]
+        if unit in HIGHER_IS_BETTER
+        else [sample * 1000 for sample in samples]
+    )
+
+    return {
+        "unit": unit,
+        "value": round(values[len(values) // 2], 3),
+        "best": round(values[0] if unit not in HIGHER_IS_BETTER else values[-1], 3),
+        "worst": round(values[-1] if unit not in HIGHER_IS_BETTER else values[0], 3),
+        "rounds": len(samples),
+        "peak_kb": round(peak / 1024, 1),
+    }
+
+
+def bench_build(sizes: List[int], min_time: float) -> Dict[str, Dict]:
+    """
+    Validation and compilation of the flow, bypassing the graph cache
+
+    Args:
+        - sizes: Number of nodes of the agents
+        - min_time: Seconds to spend per benchmark
+    """
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        agent: Agent = synthetic_agent(size)
+
+        def build() -> None:
+            agent.validate_flow()
+            agent.compile_flow()
+
+        results[f"build_flow.{size}"] = measure(build, "ms", min_time)
+
+    return results
+
+
+def bench_repositories(
+    client: MongoClient, sizes: List[int], min_time: float, lookup: bool
+) -> Dict[str, Dict]:
+    """
+    Latency of AgentRepository.get and ProjectRepository.get_all
+
+    Args:
+        - client: MongoDB client
+        - sizes: Number of nodes of the seeded agents
+        - min_time: Seconds to spend per benchmark
+        - lookup: Whether to benchmark LOOKUP hydration too
+    """
+    context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+    agent_repository: AgentRepository = AgentRepository(context)
+    project_repository: ProjectRepository = ProjectRepository(context)
+
+    hydrations: List[MongoEnum.Hydration] = [MongoEnum.Hydration.BATCH]
+    if lookup:
+        hydrations.append(MongoEnum.Hydration.LOOKUP)
+
+    results: Dict[str, Dict] = {}
+    agents: Dict[int, Agent] = seed(client, sizes)
+    try:
+        for size, agent in agents.items():
+            for hydration in hydrations:
+                results[f"agent_get.{hydration.value}.{size}"] = measure(
+                    lambda: agent_repository.get(str(agent.id), hydration),
+                    "ms",
+                    min_time,
+                )
+                results[f"project_get_all.{hydration.value}.{size}"] = measure(
+                    lambda: project_repository.get_all(
+                        {"_id": ObjectId(agent.project_id)}, hydration
+                    ),
+                    "ms",
+                    min_time,
+                )
+    finally:
+        unseed(client, agents)
+
+    return results
+
+
+def bench_runs(sizes: List[int], min_time: float, concurrency: int) -> Dict[str, Dict]:
+    """
+    End-to-end throughput of concurrent runs, with the local-fake model
+
+    Args:
+        - sizes: Number of nodes of the agents
+        - min_time: Seconds to spend per benchmark
+        - concurrency: Runs in flight at the same time
+    """
+    results: Dict[str, Dict] = {}
+    for size in sizes:
+        agent: Agent = synthetic_agent(size)
+        agent.build_flow()
+
+        async def runs() -> None:
+            await asyncio.gather(*(agent.arun() for _ in range(concurrency)))
+
+        results[f"run.{size}"] = measure(
+            lambda: asyncio.run(runs()), "runs/s", min_time, operations=concurrency
+        )
+
+    return results
+
+
+def compare(
+    results: Dict[str, Dict], baseline: Dict[str, Dict], threshold: float
+) -> int:
+    """
+    Prints the results next to the baseline
+
+    Args:
+        - results: Current results
+        - baseline: Stored results
+        - threshold: Relative change above which a benchmark regressed
+
+    Returns:
+        - Number of regressions
+    """
+    table = Table(title="Benchmarks")
+    table.add_column("benchmark")
+    table.add_column("unit")
+    table.add_column("baseline", justify="right")
+    table.add_column("current", justify="right")
+    table.add_column("change", justify="right")
+    table.add_column("peak KiB", justify="right")
+    table.add_column("memory", justify="right")
+    table.add_column("status")
+
+    regressions: int = 0
+    for name, result in results.items():
+        previous: Union[Dict, None] = baseline.get(name)
+        if not previous:
+            table.add_row(
+                name,
+                result["unit"],
+                "",
+                f"{result['value']:.3f}",
+                "",
+                f"{result['peak_kb']:.1f}",
+                "",
+                "new",
+            )
+            continue
+
+        change: float = (result["value"] - previous["value"]) / previous["value"]
+        slower: float = -change if result["unit"] in HIGHER_IS_BETTER else change
+        memory: float = (
+            (result["peak_kb"] - previous["peak_kb"]) / previous["peak_kb"]
+            if previous["peak_kb"]
+            else 0.0
+        )
+        regressed: bool = slower > threshold or memory > threshold
+        regressions += regressed
+        table.add_row(
+            name,
+            result["unit"],
+            f"{previous['value']:.3f}",
+            f"{result['value']:.3f}",
+            f"{change:+.1%}",
+            f"{result['peak_kb']:.1f}",
+            f"{memory:+.1%}",
+            "[red]regressed[/red]" if regressed else "ok",
+        )
+
+    print(table)
+
+    return regressions
+
+
+@app.command()
+def main(
+    sizes: Annotated[str, typer.Option()] = "10,100,1000",
+    run_sizes: Annotated[str, typer.Option()] = "10,100",
+    mongodb_uri: Annotated[str, typer.Option()] = "",
+    concurrency: Annotated[int, typer.Option(min=1)] = 8,
+    min_time: Annotated[float, typer.Option(min=0)] = 1.0,
+    baseline: Annotated[str, typer.Option()] = BASELINE,
+    threshold: Annotated[float, typer.Option(min=0)] = 0.25,
+    save: Annotated[bool, typer.Option()] = False,
+) -> None:
+    """
+    Runs the benchmarks and compares them with the baseline
+
+    args:
+        - sizes (optional): Comma separated number of nodes of the agents
+        - run-sizes (optional): Number of nodes of the agents whose runs are
+          benchmarked. A run of 1000 nodes takes minutes
+        - mongodb-uri (optional): MongoDB server for the repository
+          benchmarks. Uses mongomock by default, which does not support
+          LOOKUP hydration
+        - concurrency (optional): Runs in flight in the throughput benchmark
+        - min-time (optional): Seconds to spend per benchmark
+        - baseline (optional): JSON file with the stored results
+        - threshold (optional): Relative change above which a benchmark regressed
+        - save (optional): Stores the results as the baseline
+    """
+    node_counts: List[int] = [int(size) for size in sizes.split(",") if size]
+    run_counts: List[int] = [int(size) for size in run_sizes.split(",") if size]
+
+    results: Dict[str, Dict] = {}
+    LOGGER.warning("Benchmarking flow builds...")
+    results.update(bench_build(node_counts, min_time))
+
+    if mongodb_uri:
+        client: Union[MongoClient, None] = MongoClient(
+            mongodb_uri, **get_client_settings()
+        )
+    else:
+        try:
+            import mongomock
+        except ImportError:
+            LOGGER.warning(
+                "Skipping repository benchmarks: install mongomock or set --mongodb-uri"
+            )
+            client = None
+        else:
+            client = mongomock.MongoClient()
+
+    if client is not None:
+        LOGGER.warning("Benchmarking repositories...")
+        results.update(
+            bench_repositories(client, node_counts, min_time, lookup=bool(mongodb_uri))
+        )
+        client.close()
+
+    LOGGER.warning("Benchmarking runs...")
+    results.update(bench_runs(run_counts, min_time, concurrency))
+
+    stored: Dict = {}
+    if os.path.exists(baseline):
+        with open(baseline) as file:
+            stored = json.load(file)
+
+    regressions: int = compare(results, stored.get("results", {}), threshold)
+
+    if save:
+        with open(baseline, "w") as file:
+            json.dump(
+                {
+                    "created_at": datetime.now(timezone.utc).isoformat(),
+                    "machine": {
+                        "python": platform.python_version(),
+                        "platform": platform.platform(),
+                        "processor": platform.machine(),
+                    },
+                    "settings": {
+                        "sizes": node_counts,
+                        "run_sizes": run_counts,
+                        "mongodb": "server" if mongodb_uri else "mongomock",
+                        "concurrency": concurrency,
+                    },
+                    "results": results,
+                },
+                file,
+                indent=2,
+            )
+        LOGGER.warning(f"Baseline saved to {baseline}")
+        return
+
+    if regressions:
+        LOGGER.error(f"{regressions} benchmarks regressed by more than {threshold:.0%}")
+        raise typer.Exit(code=1)
+
+
+if __name__ == "__main__":
+    app()
@@ -1,17 +1,62 @@
 """
 Defines CLI tool to create agents
+
+Command groups are imported when they are invoked, so e.g. `project read` does
+not load LangGraph, LangChain or the worker dependencies, and `--help` does
+not load any of them.
 """
-import typer
+from importlib import import_module
+from typing import Dict, List, Optional, Tuple
+
+import click
+from dotenv import load_dotenv
+
+# Command modules are imported lazily, so .env is loaded here rather than
+# as a side effect of whichever module happens to be imported first
+load_dotenv()
+
+# Command group name: (module defining a Typer `app`, short help)
+COMMANDS: Dict[str, Tuple[str, str]] = {
+    "agent": ("commands.agent.main", "Creates, exports and runs agents"),
+    "db": ("commands.db.main", "Migrates and checks database indexes"),
+    "job": ("commands.job.main", "Queues agent runs as jobs"),
+    "node": ("commands.node.main", "Creates and updates nodes"),
+    "project": ("commands.project.main", "Creates and updates projects"),
+    "worker": ("commands.worker.main", "Runs a worker that serves agent runs"),
+}
+
+
+class LazyGroup(click.Group):
+    """
+    Click group that imports a command group on first use
+    """
+
+    def list_commands(self, ctx: click.Context) -> List[str]:
+        return sorted(COMMANDS)
+
+    def get_command(self, ctx: click.Context, name: str) -> Optional[click.Command]:
+        if name not in COMMANDS:
+            return None
+
+        import typer
+
+        # Mounted the same way add_typer did, so subcommands behave as before
+        root: typer.Typer = typer.Typer(add_completion=False)
+        root.add_typer(import_module(COMMANDS[name][0]).app, name=name)
+
+        return typer.main.get_group(root).commands[name]
 
-from commands.agent.main import app as agent_app
-from commands.node.main import app as node_app
-from commands.project.main import app as project_app
+    def format_commands(
+        self, ctx: click.Context, formatter: click.HelpFormatter
+    ) -> None:
+        # Uses the static help, so listing commands does not import them
+        with formatter.section("Commands"):
+            formatter.write_dl(
+                [(name, help) for name, (_, help) in sorted(COMMANDS.items())]
+            )
 
-app = typer.Typer()
 
-app.add_typer(agent_app, name="agent")
-app.add_typer(node_app, name="node")
-app.add_typer(project_app, name="project")
+app = LazyGroup(help="Manages and runs agent_00 agents")
 
 if __name__  == "__main__":
     app()
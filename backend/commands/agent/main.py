@@ -2,21 +2,44 @@
 Defines commands to run CRUD operations against agents
 """
 
-import tempfile
+from time import perf_counter
 from types import SimpleNamespace
-from typing import Annotated, List, Union
+from typing import (
+    TYPE_CHECKING,
+    Annotated,
+    Dict,
+    Iterator,
+    List,
+    TextIO,
+    Tuple,
+    Union,
+)
+import asyncio
+import json
+import sys
+import tempfile
 
-from PIL import Image
 from rich import print
 from rich.table import Table
 import typer
 
 from models.agent import Agent
-from repositories.agent import AgentRepository
+from models.node.llm import LLMNode
+from models.run import Run
+from repositories.agent import AgentRepository, AsyncAgentRepository
+from repositories.run import RunRepository
+from utils.llm_batcher import batcher_stats
+from utils.llm_cache import LLMCacheBackend, cache_stats
 from utils.logger import LOGGER
-from utils.mongodb_client import Mongo
+from utils.metrics import summarize_latencies
+from utils.mongodb_client import Mongo, get_async_mongodb_client, get_mongodb_client
+from utils.rate_limiter import rate_limiter_stats
+from utils.tracing import start_tracing, stop_tracing
 from utils.enum import CLI
 
+if TYPE_CHECKING:
+    from langgraph.checkpoint.base import BaseCheckpointSaver
+
 app = typer.Typer()
 
 
@@ -52,6 +75,50 @@ def print_agents(agents: Union[List[Agent], Agent]) -> None:
     print(table)
 
 
+def get_checkpointer(context: SimpleNamespace) -> "BaseCheckpointSaver":
+    """
+    Creates the MongoDB checkpointer of a run. LangGraph is imported here, so
+    commands that do not run agents do not load it
+
+    Args:
+        - context: Context with the MongoDB client
+    """
+    from repositories.checkpoint import CheckpointRepository
+
+    return CheckpointRepository(context)
+
+
+def print_runs(runs: List[Run]) -> None:
+    """
+    Print runs as a Table
+
+    Args:
+        - runs: Run data
+    """
+    if not runs:
+        print("Runs not found")
+        return
+
+    table = Table(title="Runs Found")
+    table.add_column("run_id")
+    table.add_column("status")
+    table.add_column("started_at")
+    table.add_column("duration_ms")
+    table.add_column("nodes")
+    table.add_column("error")
+    for run in runs:
+        table.add_row(
+            run.run_id,
+            run.status.value,
+            run.started_at.isoformat(),
+            str(run.duration_ms),
+            ", ".join(f"{node.name}: {node.duration_ms}ms" for node in run.nodes),
+            run.error or "",
+        )
+
+    print(table)
+
+
 @app.command()
 def create(
     name: Annotated[str, typer.Option(prompt=True)],
@@ -170,6 +237,28 @@ def delete(id: Annotated[str, typer.Option(prompt=True)]) -> None:
         LOGGER.info("Agent deleted")
 
 
+@app.command()
+def export(id: Annotated[str, typer.Option(prompt=True)]) -> None:
+    """
+    Writes an agent and its nodes to stdout as a bundle that `agent run
+    --bundle` can run without a database
+
+    args:
+        - id: Identifier of the agent
+    """
+    LOGGER.info("Exporting agent...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+        agent_repository: AgentRepository = AgentRepository(context)
+        agent: Union[Agent, None] = agent_repository.get(id)
+        if not agent:
+            LOGGER.info("Agent not found")
+            raise typer.Exit(code=1)
+
+    agent.validate_flow()
+    sys.stdout.write(json.dumps(agent.to_bundle(), indent=2) + "\n")
+
+
 @app.command()
 def visualize(id: Annotated[str, typer.Option(prompt=True)]) -> None:
     """
@@ -194,6 +283,8 @@ def visualize(id: Annotated[str, typer.Option(prompt=True)]) -> None:
             return
 
         LOGGER.info(f"State: {agent.state.__dict__}")
+        from PIL import Image
+
         with tempfile.NamedTemporaryFile(suffix=".png") as tmp:
             tmp.write(agent.graph.get_graph().draw_mermaid_png())
             tmp.seek(0)
@@ -201,22 +292,354 @@ def visualize(id: Annotated[str, typer.Option(prompt=True)]) -> None:
             img.show()
 
 
+def load_bundle(path: str) -> Agent:
+    """
+    Loads an agent from a bundle file written by `agent export`
+
+    Bundles run without a database, so llm nodes caching their responses in
+    MongoDB use the SQLite cache instead.
+
+    args:
+        - path: Path of the bundle
+    """
+    with open(path) as bundle:
+        agent: Agent = Agent.from_bundle(json.load(bundle))
+
+    for node in agent.nodes:
+        if (
+            isinstance(node, LLMNode)
+            and node.cache
+            and node.cache.backend == LLMCacheBackend.mongo
+        ):
+            LOGGER.warning(
+                f"Node {node.name} caches responses in SQLite instead of MongoDB"
+            )
+            node.cache.backend = LLMCacheBackend.sqlite
+            # Resets the definition hash, computed when the bundle was checked
+            agent.nodes = list(agent.nodes)
+
+    LOGGER.info(f"Loaded agent {agent.name} from {path}")
+
+    return agent
+
+
+async def aget_agent(
+    id: str, checkpoint: bool = False, bundle: str = ""
+) -> Union[Agent, None]:
+    """
+    Loads an agent asynchronously
+
+    args:
+        - id: Identifier of the agent
+        - checkpoint (optional): Checkpoints the runs of the agent in MongoDB
+        - bundle (optional): Loads the agent from a bundle file instead of
+          MongoDB. Runs are neither checkpointed nor recorded
+    """
+    if bundle:
+        return load_bundle(bundle)
+
+    context: SimpleNamespace = SimpleNamespace(
+        mongodb_client=get_mongodb_client(),
+        async_mongodb_client=get_async_mongodb_client(),
+        logger=LOGGER,
+    )
+
+    agent_repository: AsyncAgentRepository = AsyncAgentRepository(context)
+    agent: Union[Agent, None] = await agent_repository.get(agent_id=id)
+    if not agent:
+        LOGGER.info("Agent not found")
+        return None
+
+    if checkpoint:
+        agent.memory = get_checkpointer(context)
+    agent.history = RunRepository(context).writer
+
+    return agent
+
+
+async def arun(id: str, checkpoint: bool = False, bundle: str = "") -> None:
+    """
+    Loads and runs an agent asynchronously
+
+    args:
+        - id: Identifier of the agent
+        - checkpoint (optional): Checkpoints the run in MongoDB
+        - bundle (optional): Loads the agent from a bundle file
+    """
+    agent: Union[Agent, None] = await aget_agent(id, checkpoint, bundle)
+    if not agent:
+        return
+
+    response: Union[Dict, None] = await agent.arun()
+    if response:
+        print(response)
+
+
+async def astream(id: str, checkpoint: bool = False, bundle: str = "") -> None:
+    """
+    Loads and runs an agent, writing tokens to stdout as they arrive
+
+    args:
+        - id: Identifier of the agent
+        - checkpoint (optional): Checkpoints the run in MongoDB
+        - bundle (optional): Loads the agent from a bundle file
+    """
+    agent: Union[Agent, None] = await aget_agent(id, checkpoint, bundle)
+    if not agent:
+        return
+
+    async for event in agent.astream():
+        if event["event"] == "token":
+            sys.stdout.write(event["content"])
+            sys.stdout.flush()
+        elif event["event"] == "node":
+            LOGGER.info(f"Node {event['node']} completed")
+        else:
+            sys.stdout.write("\n")
+            print(event["output"])
+
+
 @app.command()
-def run(id: Annotated[str, typer.Option(prompt=True)]) -> None:
+def run(
+    id: Annotated[str, typer.Option()] = "",
+    use_async: Annotated[bool, typer.Option("--async")] = False,
+    checkpoint: Annotated[bool, typer.Option()] = False,
+    stream: Annotated[bool, typer.Option()] = False,
+    trace: Annotated[str, typer.Option()] = "",
+    bundle: Annotated[str, typer.Option()] = "",
+) -> None:
     """
     Runs an agent
 
     args:
-        - id: Identifier of the agent
+        - id: Identifier of the agent. Prompted if no bundle is given
+        - async (optional): Runs the agent on the asyncio execution path
+        - checkpoint (optional): Checkpoints every step in MongoDB, so the run
+          can be resumed with `agent resume`
+        - stream (optional): Prints llm tokens and node completions as they
+          happen. Runs on the asyncio execution path
+        - trace (optional): Path of a Chrome trace file to write the graph
+          build, node, llm, MongoDB and checkpoint spans to
+        - bundle (optional): Runs an agent exported with `agent export`
+          without connecting to MongoDB. Runs are neither checkpointed nor
+          recorded
     """
+    if not id and not bundle:
+        id = typer.prompt("Id")
+    if bundle and checkpoint:
+        LOGGER.warning("Checkpoints are not supported for bundles")
+        checkpoint = False
+
     LOGGER.info("Running agent...")
+    if trace:
+        start_tracing()
+
+    try:
+        if stream:
+            asyncio.run(astream(id, checkpoint, bundle))
+            return
+
+        if use_async:
+            asyncio.run(arun(id, checkpoint, bundle))
+            return
+
+        if bundle:
+            response: Union[Dict, None] = load_bundle(bundle).run()
+            if response:
+                print(response)
+            return
+
+        with Mongo() as client:
+            context: SimpleNamespace = SimpleNamespace(
+                mongodb_client=client, logger=LOGGER
+            )
+
+            agent_repository: AgentRepository = AgentRepository(context)
+            agent: Union[Agent, None] = agent_repository.get(agent_id=id)
+            if not agent:
+                LOGGER.info("Agent not found")
+                return
+
+            if checkpoint:
+                agent.memory = get_checkpointer(context)
+            agent.history = RunRepository(context).writer
+
+            response = agent.run()
+            if response:
+                print(response)
+    finally:
+        if trace:
+            stop_tracing(trace)
+            LOGGER.info(f"Trace written to {trace}")
+
+
+@app.command()
+def resume(
+    run_id: Annotated[str, typer.Option(prompt=True)],
+    id: Annotated[str, typer.Option()] = "",
+) -> None:
+    """
+    Resumes a checkpointed run from its last completed node
+
+    args:
+        - run_id: Identifier of the run, printed when the run started
+        - id (optional): Identifier of the agent. Defaults to the run id prefix
+    """
+    LOGGER.info("Resuming agent run...")
     with Mongo() as client:
         context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
 
         agent_repository: AgentRepository = AgentRepository(context)
-        agent: Union[Agent, None] = agent_repository.get(agent_id=id)
+        agent: Union[Agent, None] = agent_repository.get(
+            agent_id=id or run_id.split("-")[0]
+        )
         if not agent:
             LOGGER.info("Agent not found")
             return
 
-        agent.run()
+        agent.memory = get_checkpointer(context)
+        agent.history = RunRepository(context).writer
+        response: Union[Dict, None] = agent.resume(run_id)
+        if response:
+            print(response)
+
+
+@app.command()
+def runs(
+    id: Annotated[str, typer.Option(prompt=True)],
+    status: Annotated[Union[Run.Status, None], typer.Option()] = None,
+    limit: Annotated[int, typer.Option(min=1)] = 20,
+) -> None:
+    """
+    Lists the latest runs of an agent
+
+    args:
+        - id: Identifier of the agent
+        - status (optional): Only lists runs with this status
+        - limit (optional): Maximum number of runs
+    """
+    LOGGER.info("Getting runs...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+
+        run_repository: RunRepository = RunRepository(context)
+        print_runs(run_repository.get_all(id, status=status, limit=limit))
+
+
+async def arun_batch(
+    id: str,
+    inputs: str,
+    output: str,
+    concurrency: int,
+    checkpoint: bool = False,
+    bundle: str = "",
+) -> Union[Dict, None]:
+    """
+    Runs an agent once per input record with bounded concurrency, writing
+    each result as soon as it finishes
+
+    args:
+        - id: Identifier of the agent
+        - inputs: Path of a JSONL file. Each line maps state keys to values
+        - output: Path of the JSONL file to write results to
+        - concurrency: Maximum number of runs in flight
+        - checkpoint (optional): Checkpoints the runs in MongoDB
+        - bundle (optional): Loads the agent from a bundle file
+
+    returns:
+        - Throughput and latency summary
+    """
+    agent: Union[Agent, None] = await aget_agent(id, checkpoint, bundle)
+    if not agent:
+        return None
+
+    latencies: List[float] = []
+
+    async def worker(records: Iterator[Tuple[int, str]], results: TextIO) -> None:
+        for index, line in records:
+            started: float = perf_counter()
+            result: Dict = {"index": index, "thread_id": f"{agent.id}-{index}"}
+            try:
+                result["output"] = await agent.arun(
+                    json.loads(line), thread_id=result["thread_id"]
+                )
+                result["status"] = "success"
+            except Exception as error:
+                LOGGER.error(f"Record {index} failed: {error}")
+                result["status"] = "error"
+                result["error"] = str(error)
+
+            latency: float = perf_counter() - started
+            latencies.append(latency)
+            result["latency_ms"] = round(latency * 1000, 3)
+            results.write(json.dumps(result, default=str) + "\n")
+            results.flush()
+
+    started: float = perf_counter()
+    with open(inputs) as records, open(output, "w") as results:
+        # Workers share the iterator, so records are read lazily
+        lines: Iterator[Tuple[int, str]] = (
+            (index, line) for index, line in enumerate(records) if line.strip()
+        )
+        await asyncio.gather(*(worker(lines, results) for _ in range(concurrency)))
+
+    return summarize_latencies(latencies, perf_counter() - started)
+
+
+@app.command()
+def run_batch(
+    inputs: Annotated[str, typer.Option(prompt=True)],
+    id: Annotated[str, typer.Option()] = "",
+    output: Annotated[str, typer.Option()] = "results.jsonl",
+    concurrency: Annotated[int, typer.Option(min=1)] = 8,
+    checkpoint: Annotated[bool, typer.Option()] = False,
+    trace: Annotated[str, typer.Option()] = "",
+    bundle: Annotated[str, typer.Option()] = "",
+) -> None:
+    """
+    Runs an agent over a JSONL file of inputs
+
+    args:
+        - id: Identifier of the agent. Prompted if no bundle is given
+        - inputs: JSONL file. Each line maps state keys (e.g. input node
+          output names) to values
+        - output (optional): JSONL file to stream results to
+        - concurrency (optional): Maximum number of runs in flight
+        - checkpoint (optional): Checkpoints the runs in MongoDB. Run ids are
+          <agent_id>-<line index>
+        - trace (optional): Path of a Chrome trace file to write spans to.
+          Each concurrent run gets its own track
+        - bundle (optional): Runs an agent exported with `agent export`
+          without loading it from MongoDB
+    """
+    if not id and not bundle:
+        id = typer.prompt("Id")
+
+    LOGGER.info("Running agent batch...")
+    if trace:
+        start_tracing()
+
+    try:
+        summary: Union[Dict, None] = asyncio.run(
+            arun_batch(id, inputs, output, concurrency, checkpoint, bundle)
+        )
+    finally:
+        if trace:
+            stop_tracing(trace)
+            LOGGER.info(f"Trace written to {trace}")
+
+    if not summary:
+        return
+
+    table = Table(title="Batch summary")
+    for key in summary:
+        table.add_column(key)
+    table.add_row(*(str(value) for value in summary.values()))
+
+    print(table)
+    if cache_stats():
+        LOGGER.info(f"LLM cache: {cache_stats()}")
+    if rate_limiter_stats():
+        LOGGER.info(f"LLM rate limiters: {rate_limiter_stats()}")
+    if batcher_stats():
+        LOGGER.info(f"LLM batches: {batcher_stats()}")
@@ -0,0 +1,138 @@
+"""
+Defines commands to manage the database
+"""
+
+from types import SimpleNamespace
+from typing import Annotated, Dict, List
+import os
+
+from rich import print
+from rich.table import Table
+import typer
+
+from repositories.agent import AgentRepository
+from repositories.node import NodeRepository
+from repositories.project import ProjectRepository
+from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, find_collection_scans
+from utils.logger import LOGGER
+from utils.mongodb_client import Mongo
+
+app = typer.Typer()
+
+REPOSITORIES = {
+    MongoEnum.Collection.PROJECTS: ProjectRepository,
+    MongoEnum.Collection.AGENTS: AgentRepository,
+    MongoEnum.Collection.NODES: NodeRepository,
+}
+
+
+@app.command()
+def migrate(
+    force: Annotated[bool, typer.Option()] = False,
+    prune: Annotated[bool, typer.Option()] = False,
+) -> None:
+    """
+    Creates the declared indexes whose version is newer than the applied one
+
+    args:
+        - force (optional): Creates the indexes even if versions are up to date
+        - prune (optional): Drops indexes that are no longer declared
+    """
+    # Repositories register their indexes on import. The checkpoint one pulls
+    # LangGraph in, so they are only imported when migrating
+    import repositories.checkpoint  # noqa: F401
+    import repositories.job  # noqa: F401
+    import repositories.llm_cache  # noqa: F401
+    import repositories.run  # noqa: F401
+
+    LOGGER.info("Migrating indexes...")
+    with Mongo() as client:
+        migrated: List[MongoEnum.Collection] = INDEX_REGISTRY.ensure_all(
+            client, force=force, prune=prune
+        )
+
+    if not migrated:
+        LOGGER.info("Indexes are up to date")
+        return
+
+    LOGGER.info(f"Migrated: {[collection.value for collection in migrated]}")
+
+
+@app.command()
+def explain(
+    database: Annotated[str, typer.Option()] = os.getenv(
+        "MONGODB_EXPLAIN_DATABASE", "agent_00_explain"
+    ),
+) -> None:
+    """
+    Explains every repository query shape against a scratch database and
+    fails if any of them scans a whole collection
+
+    args:
+        - database (optional): Scratch database. It is dropped before and after
+    """
+    LOGGER.info(f"Explaining repository queries on {database}...")
+    table = Table(title="Query plans")
+    table.add_column("collection")
+    table.add_column("query")
+    table.add_column("collection scans")
+
+    failures: int = 0
+    with Mongo() as client:
+        client.drop_database(database)
+        scratch = client[database]
+        try:
+            for collection in REPOSITORIES:
+                scratch[collection].create_indexes(INDEX_REGISTRY.indexes(collection))
+
+            seed: SimpleNamespace = SimpleNamespace()
+            seed.project_id = str(
+                scratch[MongoEnum.Collection.PROJECTS]
+                .insert_one({"name": "explain", "description": "explain"})
+                .inserted_id
+            )
+            seed.agent_id = str(
+                scratch[MongoEnum.Collection.AGENTS]
+                .insert_one({"name": "explain", "project_id": seed.project_id})
+                .inserted_id
+            )
+            seed.node_id = str(
+                scratch[MongoEnum.Collection.NODES]
+                .insert_one(
+                    {"name": "explain", "type": "input", "agent_id": seed.agent_id}
+                )
+                .inserted_id
+            )
+
+            for collection, repository in REPOSITORIES.items():
+                for shape in repository.query_shapes(seed):
+                    plan: Dict = (
+                        scratch[collection].find(shape["filter"]).explain()
+                        if "filter" in shape
+                        else scratch.command(
+                            "explain",
+                            {
+                                "aggregate": collection.value,
+                                "pipeline": shape["pipeline"],
+                                "cursor": {},
+                            },
+                            verbosity="executionStats",
+                        )
+                    )
+                    scans: List[str] = find_collection_scans(plan)
+                    failures += len(scans)
+                    table.add_row(
+                        collection.value,
+                        str(shape.get("filter", shape.get("pipeline"))),
+                        "\n".join(scans) or "-",
+                    )
+        finally:
+            client.drop_database(database)
+
+    print(table)
+    if failures:
+        LOGGER.error(f"{failures} collection scans found")
+        raise typer.Exit(code=1)
+
+    LOGGER.info("Every query is served by an index")
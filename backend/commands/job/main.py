@@ -0,0 +1,131 @@
+"""
+Defines commands to queue agent runs as jobs
+"""
+
+from types import SimpleNamespace
+from typing import Annotated, Dict, List, Union
+import json
+
+import typer
+from rich import print
+from rich.table import Table
+
+from models.job import Job
+from repositories.job import JobRepository
+from utils.logger import LOGGER
+from utils.mongodb_client import Mongo
+
+app = typer.Typer()
+
+
+def print_jobs(jobs: Union[Job, List[Job]]) -> None:
+    """
+    Print jobs as a Table
+
+    Args:
+        - jobs: Job data
+    """
+    table = Table(title="Jobs")
+    table.add_column("id")
+    table.add_column("agent_id")
+    table.add_column("status")
+    table.add_column("priority")
+    table.add_column("attempts")
+    table.add_column("worker")
+    table.add_column("run_id")
+    table.add_column("error")
+
+    if isinstance(jobs, Job):
+        jobs = [jobs]
+
+    for job in jobs:
+        table.add_row(
+            str(job.id),
+            job.agent_id,
+            job.status.value,
+            str(job.priority),
+            f"{job.attempts}/{job.max_attempts}",
+            job.worker or "",
+            job.run_id or "",
+            job.error or "",
+        )
+    print(table)
+
+
+@app.command()
+def create(
+    agent_id: Annotated[str, typer.Option(prompt=True)],
+    inputs: Annotated[str, typer.Option()] = "{}",
+    file: Annotated[str, typer.Option()] = "",
+    priority: Annotated[int, typer.Option()] = 0,
+    max_attempts: Annotated[int, typer.Option(min=1)] = 3,
+) -> None:
+    """
+    Queues runs of an agent for `worker --queue` to pick up
+
+    args:
+        - agent_id: Identifier of the agent
+        - inputs (optional): JSON object mapping state keys to values
+        - file (optional): JSONL file with the inputs of one job per line.
+          Takes precedence over inputs
+        - priority (optional): Jobs with higher priority are run first
+        - max_attempts (optional): Attempts before a job fails
+    """
+    LOGGER.info("Queueing jobs...")
+    if file:
+        with open(file) as records:
+            job_inputs: List[Dict] = [
+                json.loads(line) for line in records if line.strip()
+            ]
+    else:
+        job_inputs = [json.loads(inputs)]
+
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+        job_repository: JobRepository = JobRepository(context)
+        jobs: List[Job] = job_repository.create(
+            agent_id, job_inputs, priority=priority, max_attempts=max_attempts
+        )
+
+    if len(jobs) == 1:
+        print_jobs(jobs)
+    else:
+        LOGGER.info(f"Queued {len(jobs)} jobs")
+
+
+@app.command()
+def read(id: Annotated[str, typer.Option(prompt=True)]) -> None:
+    """
+    Gets a job
+
+    args:
+        - id: Identifier of the job
+    """
+    LOGGER.info("Getting job...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+        job_repository: JobRepository = JobRepository(context)
+        job: Union[Job, None] = job_repository.get(id)
+        if not job:
+            LOGGER.info("Job not found")
+            return
+
+        print_jobs(job)
+
+
+@app.command()
+def stats() -> None:
+    """
+    Counts the jobs per status
+    """
+    LOGGER.info("Counting jobs...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+        job_repository: JobRepository = JobRepository(context)
+        counts: Dict[str, int] = job_repository.stats()
+
+    table = Table(title="Jobs")
+    for status in Job.Status:
+        table.add_column(status.value)
+    table.add_row(*(str(counts.get(status.value, 0)) for status in Job.Status))
+    print(table)
@@ -0,0 +1,164 @@
+"""
+Defines commands to run CRUD operations against conditional nodes
+"""
+
+from json import loads
+from types import SimpleNamespace
+from typing import Annotated, List, Union
+
+from rich import print
+from rich.table import Table
+import typer
+
+from models.node.conditional import Condition, ConditionalNode
+from models.node.main import NodeType
+from repositories.node import NodeRepository
+from utils.enum import CLI
+from utils.logger import LOGGER
+from utils.mongodb_client import Mongo
+
+app = typer.Typer()
+
+
+def print_nodes(nodes: Union[List[ConditionalNode], ConditionalNode]) -> None:
+    """
+    Print nodes as a table
+
+    args:
+        - nodes: Node data
+    """
+    table = Table(title="Nodes")
+    table.add_column("id")
+    table.add_column("name")
+    table.add_column("description")
+    table.add_column("start")
+    table.add_column("end")
+    table.add_column("target_id")
+    table.add_column("agent_id")
+    table.add_column("input")
+    table.add_column("conditionals")
+
+    if isinstance(nodes, ConditionalNode):
+        nodes = [nodes]
+
+    for node in nodes:
+        table.add_row(
+            str(node.id),
+            node.name,
+            node.description,
+            str(node.start),
+            str(node.end),
+            str(node.target_id),
+            node.agent_id,
+            node.input,
+            str(node.conditionals),
+        )
+
+    print(table)
+
+
+@app.command()
+def create(
+    name: Annotated[str, typer.Option(prompt=True)],
+    agent_id: Annotated[str, typer.Option(prompt=True)],
+    input: Annotated[str, typer.Option(prompt=True)],
+    conditionals: Annotated[str, typer.Option(prompt=True)],
+    description: Annotated[str, typer.Option(prompt=True)] = "Conditional description",
+    start: Annotated[bool, typer.Option(prompt=True)] = False,
+    end: Annotated[bool, typer.Option(prompt=True)] = False,
+    target_id: Annotated[str, typer.Option(prompt=True)] = "",
+) -> None:
+    """
+    Creates a conditional node
+
+    args:
+        - name: Name of the node
+        - agent_id: Agent id
+        - input: Name of the state value to evaluate
+        - conditionals: JSON object mapping target node ids to conditions,
+          e.g. {"<node_id>": {"operator": "eq", "value": "yes"}}
+        - description (optional): Description of the node
+        - start (optional): Whether the node is a start node
+        - end (optional): Whether the node is an end node
+        - target_id (optional): Target node id when no condition matches
+    """
+    LOGGER.info("Creating conditional node...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+
+        node_repository: NodeRepository = NodeRepository(context)
+        conditional_node = ConditionalNode(
+            type=NodeType.conditional,
+            name=name,
+            description=description,
+            start=start,
+            end=end,
+            target_id=target_id,
+            agent_id=agent_id,
+            input=input,
+            conditionals={
+                target: Condition(**condition)
+                for target, condition in loads(conditionals).items()
+            },
+        )
+        if not node_repository.create(conditional_node):
+            LOGGER.warning("Conditional node not created")
+            return
+
+        print_nodes(conditional_node)
+
+
+@app.command()
+def read(id: Annotated[str, typer.Option(prompt=True)]) -> None:
+    """
+    Gets a conditional node
+
+    args:
+        - id: Identifier of the node
+    """
+    LOGGER.info("Getting conditional node...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+        node_repository: NodeRepository = NodeRepository(context)
+        conditional_node: Union[ConditionalNode, None] = node_repository.get(id)
+        if not conditional_node:
+            LOGGER.warning("Conditional node not found")
+            return
+
+        print_nodes(conditional_node)
+
+
+@app.command()
+def update(
+    id: Annotated[str, typer.Option(prompt=True)],
+    field: Annotated[str, typer.Option(prompt=True)],
+    value: Annotated[str, typer.Option(prompt=True)],
+    type: Annotated[CLI.SupportedTypes, typer.Option(prompt=True, show_choices=True)],
+) -> None:
+    """
+    Updates a conditional node
+
+    args:
+        - id: Identifier of the node
+        - field: Field to update
+        - value: New value for the field
+        - type: Type of the field
+    """
+    LOGGER.info("Updating conditional node...")
+    with Mongo() as client:
+        context: SimpleNamespace = SimpleNamespace(mongodb_client=client, logger=LOGGER)
+
+        node_repository: NodeRepository = NodeRepository(context)
+        if not node_repository.update(
+            node_id=id,
+            update={"$set": {field: CLI.SupportedTypes.cast(value, type)}},
+        ):
+            LOGGER.warning("Conditional node not updated")
+            return
+
+        conditional_node: Union[ConditionalNode, None] = node_repository.get(id)
+        if not conditional_node:
+            LOGGER.warning("Conditional node not found")
+            return
+
+        print_nodes(conditional_node)
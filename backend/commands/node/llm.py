@@ -3,7 +3,7 @@ Defines commands to run CRUD operations against llm nodes
 """
 
 from types import SimpleNamespace
-from typing import Annotated, List, Union
+from typing import Annotated, List, Optional, Union
 
 from rich import print
 from rich.table import Table
@@ -11,9 +11,10 @@ import typer
 
 from constants.model_providers import LLMModel
 from models.node.main import Output, NodeType
-from models.node.llm import LLMModelSettings, LLMNode
+from models.node.llm import LLMCacheSettings, LLMModelSettings, LLMNode
 from repositories.node import NodeRepository
 from utils.enum import CLI
+from utils.llm_cache import LLMCacheBackend
 from utils.logger import LOGGER
 from utils.mongodb_client import Mongo
 
@@ -39,6 +40,7 @@ def print_nodes(nodes: Union[LLMNode, List[LLMNode]]) -> None:
     table.add_column("output")
     table.add_column("model")
     table.add_column("input")
+    table.add_column("cache")
 
     nodes = [nodes] if isinstance(nodes, LLMNode) else nodes
     for node in nodes:
@@ -53,6 +55,7 @@ def print_nodes(nodes: Union[LLMNode, List[LLMNode]]) -> None:
             str(node.output),
             str(node.model),
             node.input,
+            str(node.cache),
         )
 
     print(table)
@@ -71,6 +74,10 @@ def create(
     start: Annotated[bool, typer.Option(prompt=True)] = False,
     end: Annotated[bool, typer.Option(prompt=True)] = False,
     target_id: Annotated[str, typer.Option(prompt=True)] = "",
+    cache_backend: Annotated[
+        Optional[LLMCacheBackend], typer.Option(show_choices=True)
+    ] = None,
+    cache_ttl: Annotated[int, typer.Option()] = 0,
 ) -> None:
     """
     Creates a llm node
@@ -87,6 +94,9 @@ def create(
         - start (optional): Whether the llm node is a start node
         - end (optional): Whether the llm node is an end node
         - target_id (optional): Target id
+        - cache_backend (optional): Caches responses in this backend
+        - cache_ttl (optional): Seconds a cached response is valid for. 0 for
+          no expiry
     """
     LOGGER.info("Creating llm node")
     with Mongo() as client:
@@ -104,6 +114,11 @@ def create(
             output=Output(name=output_name, type=output_type),
             model=LLMModelSettings(name=llm_model, temperature=temperature),
             input=input,
+            cache=(
+                LLMCacheSettings(backend=cache_backend, ttl=cache_ttl or None)
+                if cache_backend
+                else None
+            ),
         )
         if not node_repository.create(llm_node):
             LOGGER.warning("LLM node not created")
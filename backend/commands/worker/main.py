@@ -0,0 +1,70 @@
+"""
+Defines the command to run a worker that serves agent runs
+"""
+
+from types import SimpleNamespace
+from typing import Annotated, List
+import asyncio
+
+import typer
+
+from commands.worker.pool import AgentPool
+from commands.worker.queue import QueueWorker
+from utils.logger import LOGGER
+from utils.mongodb_client import get_mongodb_client
+
+app = typer.Typer()
+
+
+@app.callback(invoke_without_command=True)
+def worker(
+    agents: Annotated[List[str], typer.Option("--agent")] = [],
+    host: Annotated[str, typer.Option()] = "127.0.0.1",
+    port: Annotated[int, typer.Option()] = 8000,
+    socket: Annotated[str, typer.Option()] = "",
+    reload_interval: Annotated[float, typer.Option(min=0)] = 5.0,
+    checkpoint: Annotated[bool, typer.Option()] = False,
+    queue: Annotated[bool, typer.Option()] = False,
+    concurrency: Annotated[int, typer.Option(min=1)] = 4,
+    lease: Annotated[float, typer.Option(min=1)] = 60.0,
+) -> None:
+    """
+    Runs a long-lived worker that keeps agents loaded and compiled, and
+    serves runs over HTTP or consumes them from the jobs queue
+
+    args:
+        - agent (optional): Identifier of an agent to pre-load. Repeat it for
+          several agents. Other agents are loaded on first use
+        - host (optional): Host to listen on
+        - port (optional): Port to listen on
+        - socket (optional): Unix socket to listen on instead of host and port
+        - reload-interval (optional): Seconds between checks for agent
+          definition changes. Disabled if 0
+        - checkpoint (optional): Checkpoints the runs in MongoDB
+        - queue (optional): Consumes jobs from the jobs collection instead of
+          serving HTTP. Run as many queue workers as needed, on any host
+        - concurrency (optional): Jobs run at the same time by a queue worker
+        - lease (optional): Seconds a claimed job is held before other
+          workers may reclaim it. Renewed while the job runs
+    """
+    LOGGER.info("Starting worker...")
+    context: SimpleNamespace = SimpleNamespace(
+        mongodb_client=get_mongodb_client(), logger=LOGGER
+    )
+
+    pool: AgentPool = AgentPool(context, reload_interval, checkpoint)
+    if agents:
+        pool.load(agents)
+
+    if queue:
+        asyncio.run(QueueWorker(context, pool, concurrency, lease).run())
+        return
+
+    # FastAPI and uvicorn are only needed to serve HTTP
+    from commands.worker.server import create_app
+    import uvicorn
+
+    if socket:
+        uvicorn.run(create_app(pool), uds=socket, log_config=None)
+    else:
+        uvicorn.run(create_app(pool), host=host, port=port, log_config=None)
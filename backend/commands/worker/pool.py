@@ -0,0 +1,176 @@
+"""
+Defines the pool of warm agents served by the worker
+"""
+
+from threading import Event, Lock, Thread
+from types import SimpleNamespace
+from typing import Dict, List, Set, Union
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from models.agent import Agent
+from models.node.llm import LLMNode
+from repositories.agent import AgentRepository
+from repositories.checkpoint import CheckpointRepository
+from repositories.run import RunRepository
+from utils.chat_models import get_chat_model
+from utils.enum import Mongo as MongoEnum
+
+
+class AgentPool:
+    """
+    Keeps agents loaded with their flows compiled, and reloads an agent when
+    its definition changes
+
+    Attributes:
+        - reload_interval: Seconds between definition checks. Disabled if 0
+        - checkpoint: Whether runs are checkpointed in MongoDB
+    """
+
+    def __init__(
+        self,
+        context: SimpleNamespace,
+        reload_interval: float = 5.0,
+        checkpoint: bool = False,
+    ) -> None:
+        self.reload_interval: float = reload_interval
+        self.checkpoint: bool = checkpoint
+        self.__context: SimpleNamespace = context
+        self.__agents: Dict[str, Agent] = {}
+        self.__hashes: Dict[str, str] = {}
+        self.__lock: Lock = Lock()
+        self.__stopped: Event = Event()
+        self.__thread: Union[Thread, None] = None
+
+    @property
+    def agents(self) -> Dict[str, str]:
+        """
+        Definition hash of each loaded agent
+        """
+        return dict(self.__hashes)
+
+    def warm(self, agent: Agent) -> Agent:
+        """
+        Compiles the flow of an agent and creates its model clients
+
+        Args:
+            - agent: Agent data
+
+        Raises:
+            - ValueError: If the flow is invalid
+        """
+        if self.checkpoint:
+            agent.memory = CheckpointRepository(self.__context)
+        agent.history = RunRepository(self.__context).writer
+        agent.build_flow()
+        for node in agent.nodes:
+            if isinstance(node, LLMNode):
+                get_chat_model(node.model.name, node.model.temperature)
+
+        return agent
+
+    def load(self, agent_ids: List[str]) -> List[Agent]:
+        """
+        Loads and warms agents with a single query, replacing the loaded
+        versions. Loaded agents that no longer exist are unloaded
+
+        Args:
+            - agent_ids: Identifiers of the agents
+        """
+        try:
+            query: Dict = {"_id": {"$in": [ObjectId(id) for id in agent_ids]}}
+        except InvalidId as error:
+            self.__context.logger.error(f"Invalid agent id: {error}")
+            return []
+
+        loaded: List[Agent] = []
+        found: Set[str] = set()
+        for agent in AgentRepository(self.__context).get_all(
+            query, hydration=MongoEnum.Hydration.BATCH
+        ):
+            found.add(str(agent.id))
+            definition_hash: str = agent.definition_hash()
+            if self.__hashes.get(str(agent.id)) == definition_hash:
+                continue
+
+            try:
+                self.warm(agent)
+            except ValueError as error:
+                self.__context.logger.error(f"Agent {agent.name} not loaded: {error}")
+                continue
+
+            with self.__lock:
+                self.__agents[str(agent.id)] = agent
+                self.__hashes[str(agent.id)] = definition_hash
+            self.__context.logger.info(
+                f"Loaded agent {agent.name}", extra={"hash": definition_hash[:12]}
+            )
+            loaded.append(agent)
+
+        for agent_id in set(agent_ids) - found:
+            if agent_id in self.__hashes:
+                self.unload(agent_id)
+                self.__context.logger.info(f"Unloaded deleted agent {agent_id}")
+
+        return loaded
+
+    def get(self, agent_id: str) -> Union[Agent, None]:
+        """
+        Gets a loaded agent, loading it on first use
+
+        Args:
+            - agent_id: Identifier of the agent
+        """
+        agent: Union[Agent, None] = self.__agents.get(agent_id)
+        if agent:
+            return agent
+
+        self.load([agent_id])
+
+        return self.__agents.get(agent_id)
+
+    def unload(self, agent_id: str) -> None:
+        """
+        Removes an agent from the pool
+
+        Args:
+            - agent_id: Identifier of the agent
+        """
+        with self.__lock:
+            self.__agents.pop(agent_id, None)
+            self.__hashes.pop(agent_id, None)
+
+    def start(self) -> None:
+        """
+        Starts checking the loaded agents for definition changes
+        """
+        if not self.reload_interval or self.__thread:
+            return
+
+        self.__thread = Thread(target=self.__watch, name="agent-reload", daemon=True)
+        self.__thread.start()
+
+    def stop(self) -> None:
+        """
+        Stops checking for definition changes
+        """
+        self.__stopped.set()
+
+    def __watch(self) -> None:
+        """
+        Reloads the agents whose definition changed, and unloads deleted
+        ones, until stopped
+
+        Agents are polled rather than watched with a change stream, so it works
+        with standalone servers too. A check is a single query for all the
+        loaded agents.
+        """
+        while not self.__stopped.wait(self.reload_interval):
+            if not self.__hashes:
+                continue
+
+            try:
+                self.load(list(self.__hashes))
+            except Exception as error:
+                self.__context.logger.error(f"Failed to reload agents: {error}")
@@ -0,0 +1,174 @@
+"""
+Defines the queue consumer of the worker
+"""
+
+from time import monotonic
+from types import SimpleNamespace
+from typing import Dict, Union
+import asyncio
+import json
+import os
+import signal
+import socket
+
+from commands.worker.pool import AgentPool
+from models.agent import Agent
+from models.job import Job
+from repositories.job import JobRepository
+
+
+class QueueWorker:
+    """
+    Claims jobs from the jobs collection and runs them with warm agents
+
+    Every worker process gets a unique identifier, so any number of them can
+    consume the same queue from any number of hosts.
+
+    Attributes:
+        - id: Identifier of the worker
+        - concurrency: Jobs run at the same time
+        - lease: Seconds a claimed job is held. Renewed every third of it
+        - poll_interval: Seconds to wait when the queue is empty
+    """
+
+    def __init__(
+        self,
+        context: SimpleNamespace,
+        pool: AgentPool,
+        concurrency: int = 4,
+        lease: float = 60.0,
+        poll_interval: float = 1.0,
+    ) -> None:
+        self.id: str = f"{socket.gethostname()}-{os.getpid()}"
+        self.concurrency: int = concurrency
+        self.lease: float = lease
+        self.poll_interval: float = poll_interval
+        self.__context: SimpleNamespace = context
+        self.__pool: AgentPool = pool
+        self.__jobs: JobRepository = JobRepository(context)
+        self.__stopped: asyncio.Event = asyncio.Event()
+
+    async def run(self) -> None:
+        """
+        Consumes jobs until SIGINT or SIGTERM. Jobs in flight are finished
+        before returning
+        """
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        for stop_signal in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(stop_signal, self.__stopped.set)
+
+        self.__pool.start()
+        self.__context.logger.info(
+            f"Worker {self.id} consuming jobs", extra={"concurrency": self.concurrency}
+        )
+        await asyncio.gather(*(self.__consume() for _ in range(self.concurrency)))
+        self.__pool.stop()
+        self.__context.logger.info(f"Worker {self.id} stopped")
+
+    async def __consume(self) -> None:
+        """
+        Claims and runs jobs one at a time, until stopped
+        """
+        while not self.__stopped.is_set():
+            job: Union[Job, None] = await asyncio.to_thread(
+                self.__jobs.claim, self.id, self.lease
+            )
+            if not job:
+                try:
+                    await asyncio.wait_for(
+                        self.__stopped.wait(), timeout=self.poll_interval
+                    )
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            await self.__process(job)
+
+    async def __process(self, job: Job) -> None:
+        """
+        Runs a job while renewing its lease. The run is cancelled if the lease
+        is lost, since another worker may claim the job
+
+        Args:
+            - job: Claimed job
+        """
+        self.__context.logger.info(
+            f"Running job {job.id}",
+            extra={"agent_id": job.agent_id, "attempt": job.attempts},
+        )
+        work: asyncio.Task = asyncio.create_task(self.__execute(job))
+        heartbeat: asyncio.Task = asyncio.create_task(self.__heartbeat(job, work))
+        try:
+            await work
+        except asyncio.CancelledError:
+            # Only cancellations by the heartbeat are handled here, the worker
+            # itself may be cancelled too
+            if not heartbeat.done():
+                raise
+            self.__context.logger.warning(f"Job {job.id} cancelled")
+        finally:
+            heartbeat.cancel()
+
+    async def __execute(self, job: Job) -> None:
+        """
+        Runs a job and records its outcome
+
+        Args:
+            - job: Claimed job
+        """
+        try:
+            agent: Union[Agent, None] = await asyncio.to_thread(
+                self.__pool.get, job.agent_id
+            )
+            if not agent:
+                await asyncio.to_thread(
+                    self.__jobs.fail, job, self.id, "Agent not found", False
+                )
+                return
+
+            # The run id is stable across attempts, so checkpointed runs of a
+            # reclaimed job share their history
+            run_id: str = f"{job.agent_id}-{job.id}"
+            output: Dict = await agent.arun(job.inputs, thread_id=run_id)
+            await asyncio.to_thread(
+                self.__jobs.complete,
+                job,
+                self.id,
+                run_id,
+                json.loads(json.dumps(output, default=str)),
+            )
+        except Exception as error:
+            self.__context.logger.error(f"Job {job.id} failed: {error}")
+            await asyncio.to_thread(self.__jobs.fail, job, self.id, str(error))
+
+    async def __heartbeat(self, job: Job, work: asyncio.Task) -> None:
+        """
+        Renews the lease of a job every third of the lease. Cancels the job
+        when the lease is lost, or could not be renewed before it expired
+
+        Args:
+            - job: Claimed job
+            - work: Task running the job
+        """
+        renewed_at: float = monotonic()
+        while True:
+            await asyncio.sleep(self.lease / 3)
+            try:
+                held: bool = await asyncio.to_thread(
+                    self.__jobs.heartbeat, job, self.id, self.lease
+                )
+            except Exception as error:
+                self.__context.logger.error(
+                    f"Failed to renew the lease of job {job.id}: {error}"
+                )
+                if monotonic() - renewed_at < self.lease:
+                    continue
+                self.__context.logger.warning(f"Lease of job {job.id} expired")
+            else:
+                if held:
+                    renewed_at = monotonic()
+                    continue
+                self.__context.logger.warning(f"Lost the lease of job {job.id}")
+
+            work.cancel()
+            return
@@ -0,0 +1,87 @@
+"""
+Defines the HTTP API of the worker
+"""
+
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Dict, Optional, Union
+from uuid import uuid4
+import asyncio
+
+from fastapi import FastAPI, HTTPException
+from pydantic import BaseModel, Field
+
+from commands.worker.pool import AgentPool
+from models.agent import GRAPH_CACHE, Agent
+from utils.llm_batcher import batcher_stats
+from utils.llm_cache import cache_stats
+from utils.logger import LOGGER
+from utils.mongodb_client import get_async_mongodb_client
+from utils.rate_limiter import rate_limiter_stats
+
+
+class RunRequest(BaseModel):
+    """
+    Represents a request to run an agent
+
+    Attributes:
+        - inputs: Values for state keys, e.g. to override input nodes
+        - thread_id: Identifier of the run. A new one is used by default
+    """
+
+    inputs: Dict = Field(default={})
+    thread_id: Optional[str] = None
+
+
+def create_app(pool: AgentPool) -> FastAPI:
+    """
+    Creates the worker API
+
+    Args:
+        - pool: Pool of warm agents to serve
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI) -> AsyncIterator[None]:
+        # Binds the async client to the server loop before the first run
+        get_async_mongodb_client()
+        pool.start()
+        yield
+        pool.stop()
+
+    app: FastAPI = FastAPI(title="agent_00 worker", lifespan=lifespan)
+
+    @app.get("/health")
+    def health() -> Dict:
+        return {
+            "agents": pool.agents,
+            "graph_cache": GRAPH_CACHE.stats,
+            "llm_cache": cache_stats(),
+            "rate_limiters": rate_limiter_stats(),
+            "batchers": batcher_stats(),
+        }
+
+    @app.post("/agents/{agent_id}/runs")
+    async def run(agent_id: str, request: RunRequest) -> Dict:
+        agent: Union[Agent, None] = await asyncio.to_thread(pool.get, agent_id)
+        if not agent:
+            raise HTTPException(status_code=404, detail="Agent not found")
+
+        thread_id: str = request.thread_id or f"{agent.id}-{uuid4().hex}"
+        try:
+            output: Dict = await agent.arun(request.inputs, thread_id=thread_id)
+        except Exception as error:
+            LOGGER.error(f"Run {thread_id} failed: {error}")
+            raise HTTPException(status_code=500, detail=str(error))
+
+        return {"run_id": thread_id, "output": output}
+
+    @app.post("/agents/{agent_id}/reload")
+    async def reload(agent_id: str) -> Dict:
+        pool.unload(agent_id)
+        agent: Union[Agent, None] = await asyncio.to_thread(pool.get, agent_id)
+        if not agent:
+            raise HTTPException(status_code=404, detail="Agent not found")
+
+        return {"agent_id": agent_id, "hash": pool.agents[agent_id]}
+
+    return app
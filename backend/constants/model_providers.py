@@ -17,13 +17,43 @@ class LLMModel(str, Enum):
     """
 
     GPT_4O = "gpt-4o"
+    LOCAL_FAKE = "local-fake"
 
 
 # TODO: Is there a better way to load the model config?
+# rpm and tpm are the requests and tokens per minute budgets. 0 is not limited
+# settings are passed to the chat model of providers that are not LangChain's
 model_provider: Dict = {
     # OPENAI
     LLMModel.GPT_4O: {
         "name": "openai",
         "api_key": os.getenv("OPENAI_API_KEY"),
-    }
+        "rpm": int(os.getenv("OPENAI_GPT_4O_RPM", 0)),
+        "tpm": int(os.getenv("OPENAI_GPT_4O_TPM", 0)),
+    },
+    # LOCAL. Synthetic responses for load testing, see LocalFakeChatModel
+    LLMModel.LOCAL_FAKE: {
+        "name": "local-fake",
+        "api_key": None,
+        "rpm": int(os.getenv("LOCAL_FAKE_RPM", 0)),
+        "tpm": int(os.getenv("LOCAL_FAKE_TPM", 0)),
+        "settings": {
+            "response": os.getenv("LOCAL_FAKE_RESPONSE", "Response to: {prompt}"),
+            "latency_ms": float(os.getenv("LOCAL_FAKE_LATENCY_MS", 0)),
+            "latency_jitter_ms": float(os.getenv("LOCAL_FAKE_LATENCY_JITTER_MS", 0)),
+            "latency_distribution": os.getenv(
+                "LOCAL_FAKE_LATENCY_DISTRIBUTION", "fixed"
+            ),
+            "token_latency_ms": float(os.getenv("LOCAL_FAKE_TOKEN_LATENCY_MS", 0)),
+            "output_tokens": int(os.getenv("LOCAL_FAKE_OUTPUT_TOKENS", 0)),
+            "error_rate": float(os.getenv("LOCAL_FAKE_ERROR_RATE", 0)),
+            "rate_limit_rate": float(os.getenv("LOCAL_FAKE_RATE_LIMIT_RATE", 0)),
+            "retry_after": float(os.getenv("LOCAL_FAKE_RETRY_AFTER", 1)),
+            "seed": (
+                int(os.getenv("LOCAL_FAKE_SEED"))
+                if os.getenv("LOCAL_FAKE_SEED")
+                else None
+            ),
+        },
+    },
 }
@@ -2,19 +2,66 @@
 Defines model for Agent
 """
 
-from typing import Dict, List, Optional, Tuple, TypedDict, Union
+from hashlib import sha256
+from collections import defaultdict
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from itertools import combinations
+from time import perf_counter
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypedDict,
+    Union,
+)
+from uuid import uuid4
+import asyncio
+import json
+import logging
+import os
 
-from langgraph.graph.state import StateGraph
-from pydantic import BaseModel, Field, ConfigDict
-from langgraph.checkpoint.memory import MemorySaver
-from langgraph.graph.graph import CompiledGraph
+from pydantic import BaseModel, Field, ConfigDict, PrivateAttr
 
+from models.node.conditional import ConditionalNode
 from models.node.input import InputNode
 from models.node.llm import LLMNode
+from models.node.main import BaseNode, NodeType
 from models.node.prompt import PromptNode
-from utils.logger import LOGGER
+from models.run import NODE_TIMINGS, Run, atimed, timed
+from utils.bulk_writer import BulkWriter
+from utils.cache import LRUCache
+from utils.logger import LOGGER, log_state
+from utils.tracing import atraced, span, traced
 from constants.pyobjectid import PyObjectId
 
+# LangGraph and LangChain are imported when a flow is built, so commands that
+# only read or write agents do not pay for them
+if TYPE_CHECKING:
+    from langchain_core.runnables import RunnableConfig
+    from langgraph.graph.graph import CompiledGraph
+
+NODES_MAP: Dict[NodeType, Type[BaseNode]] = {
+    NodeType.input: InputNode,
+    NodeType.llm: LLMNode,
+    NodeType.prompt: PromptNode,
+    NodeType.conditional: ConditionalNode,
+}
+
+# Version of the bundle format written by Agent.to_bundle
+BUNDLE_VERSION: int = 1
+
+# Compiled graphs keyed by the definition hash of the agent nodes and the
+# checkpointer they were compiled with
+GRAPH_CACHE: LRUCache = LRUCache(int(os.getenv("AGENT_GRAPH_CACHE_SIZE", 128)))
+
 
 class Agent(BaseModel):
     """
@@ -26,66 +73,601 @@ class Agent(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
     name: str
     description: Optional[str] = "Agent description"
-    nodes: Optional[List[Union[LLMNode, InputNode, PromptNode]]] = Field(default=[])
+    nodes: Optional[
+        List[Union[LLMNode, InputNode, PromptNode, ConditionalNode]]
+    ] = Field(default=[])
     project_id: str
 
     state: Optional[TypedDict] = None
-    memory: Optional[MemorySaver] = None
-    graph: Optional[CompiledGraph] = None
+    memory: Optional[Any] = None  # BaseCheckpointSaver
+    history: Optional[BulkWriter] = None
+    graph: Optional[Any] = None  # CompiledGraph
 
-    # TODO: Add support for messages history
-    # TODO: Implement export to JSON
-    def build_flow(self) -> Union[Tuple[CompiledGraph, TypedDict], None]:
+    _definition_hash: Optional[str] = PrivateAttr(default=None)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        if name == "nodes":
+            self._definition_hash = None
+        super().__setattr__(name, value)
+
+    def definition_hash(self) -> str:
         """
-        Builds a LangGraph flow
+        Content hash of the node definitions (ids, types, targets, prompts,
+        model settings, ...). Agents with the same hash build the same flow
 
-        Args:
-            - nodes: List of nodes
+        The hash is computed once per agent, since it is checked on every
+        run. Assigning nodes resets it, nodes edited in place must be assigned
+        again
         """
-        LOGGER.info(f"Building flow for Agent: {self.name}")
-        LOGGER.info(f"Nodes: {self.nodes}")
-        annotations: Dict = {}
+        if self._definition_hash is None:
+            definition: List[Dict] = sorted(
+                (node.model_dump(mode="json", by_alias=True) for node in self.nodes),
+                key=lambda node: str(node.get("_id")),
+            )
+            self._definition_hash = sha256(
+                json.dumps(definition, sort_keys=True, default=str).encode()
+            ).hexdigest()
 
-        if not self.nodes:
-            LOGGER.error("No nodes found")
-            return
+        return self._definition_hash
+
+    def upstream_outputs(self) -> Dict[str, Set[str]]:
+        """
+        Names of the outputs written by the nodes that run before each node
+
+        The source map is built once and nodes are visited in topological
+        order, so each node gets the upstream outputs of its sources without
+        walking the graph again. Nodes in or after a loop (a conditional
+        routing back) are walked from their sources, stopping at nodes whose
+        upstream outputs are known
+
+        Returns:
+            - Upstream output names keyed by node id
+        """
+        nodes: Dict[str, BaseNode] = {str(node.id): node for node in self.nodes}
+        sources: Dict[str, List[str]] = defaultdict(list)
+        pending_sources: Dict[str, int] = {node_id: 0 for node_id in nodes}
+        for node_id, node in nodes.items():
+            for target in node.targets:
+                if target in nodes:
+                    sources[target].append(node_id)
+                    pending_sources[target] += 1
+
+        upstream: Dict[str, Set[str]] = {}
+        ready: List[str] = [
+            node_id for node_id, count in pending_sources.items() if not count
+        ]
+        while ready:
+            node_id: str = ready.pop()
+            outputs: Set[str] = set()
+            for source in sources[node_id]:
+                outputs |= upstream[source]
+                if nodes[source].output:
+                    outputs.add(nodes[source].output.name)
+            upstream[node_id] = outputs
+
+            for target in nodes[node_id].targets:
+                if target in pending_sources:
+                    pending_sources[target] -= 1
+                    if not pending_sources[target]:
+                        ready.append(target)
+
+        for node_id in nodes:
+            if node_id in upstream:
+                continue
+
+            outputs = set()
+            visited: Set[str] = set()
+            pending: List[str] = [node_id]
+            while pending:
+                for source in sources[pending.pop()]:
+                    if source in visited:
+                        continue
+
+                    visited.add(source)
+                    if nodes[source].output:
+                        outputs.add(nodes[source].output.name)
+                    if source in upstream:
+                        outputs |= upstream[source]
+                    else:
+                        pending.append(source)
+            upstream[node_id] = outputs
+
+        return upstream
+
+    def parallel_writers(self) -> List[Tuple[str, str, str]]:
+        """
+        Pairs of nodes that write the same output and can run in the same
+        superstep. State keys have no reducer, so LangGraph rejects such
+        concurrent updates at run time
+
+        Two writers can run together when neither runs after the other and a
+        node (or the entry point, with many start nodes) fans out to both
+        through different targets. Conditional nodes take a single route, so
+        their targets never run together
+
+        Returns:
+            - Output name and names of both nodes, for every pair
+        """
+        writers: Dict[str, List[BaseNode]] = defaultdict(list)
+        for node in self.nodes:
+            if node.output:
+                writers[node.output.name].append(node)
+        if all(len(nodes) < 2 for nodes in writers.values()):
+            return []
+
+        sources: Dict[str, List[str]] = defaultdict(list)
+        for node in self.nodes:
+            for target in node.targets:
+                sources[target].append(str(node.id))
+
+        def ancestors(node_id: str) -> Set[str]:
+            found: Set[str] = {node_id}
+            pending: List[str] = [node_id]
+            while pending:
+                for source in sources[pending.pop()]:
+                    if source not in found:
+                        found.add(source)
+                        pending.append(source)
+
+            return found
+
+        fan_outs: List[List[str]] = [
+            node.targets
+            for node in self.nodes
+            if not isinstance(node, ConditionalNode) and len(node.targets) > 1
+        ]
+        fan_outs.append([str(node.id) for node in self.nodes if node.start])
+
+        pairs: List[Tuple[str, str, str]] = []
+        for name, nodes in writers.items():
+            for first, second in combinations(nodes, 2):
+                first_ancestors: Set[str] = ancestors(str(first.id))
+                second_ancestors: Set[str] = ancestors(str(second.id))
+                if (
+                    str(first.id) in second_ancestors
+                    or str(second.id) in first_ancestors
+                ):
+                    continue
+
+                if any(
+                    first_target != second_target
+                    and first_target in first_ancestors
+                    and second_target in second_ancestors
+                    for targets in fan_outs
+                    for first_target in targets
+                    for second_target in targets
+                ):
+                    pairs.append((name, first.name, second.name))
+
+        return pairs
+
+    def validate_flow(self) -> None:
+        """
+        Checks that every prompt variable is declared as an input of its node
+        and written by an upstream node, that conditional inputs are written
+        by an upstream node, that conditional nodes neither end the flow nor
+        route to join nodes, and that nodes running in parallel write
+        different outputs, so bad flows fail before running
+
+        Raises:
+            - ValueError: If a prompt variable or conditional input is missing,
+              a conditional node ends or routes to a join node, or parallel
+              nodes write the same output
+        """
+        errors: List[str] = [
+            f"{first} and {second} write {name} and can run in parallel"
+            for name, first, second in self.parallel_writers()
+        ]
+        upstream: Dict[str, Set[str]] = self.upstream_outputs()
+        joins: Dict[str, str] = {
+            str(node.id): node.name for node in self.nodes if node.join
+        }
+        for node in self.nodes:
+            if isinstance(node, ConditionalNode):
+                if node.input not in upstream[str(node.id)]:
+                    errors.append(
+                        f"{node.name}: {node.input} is not written by an "
+                        "upstream node"
+                    )
+                # A join waits for every source, but a conditional only takes
+                # one route, so the join could never run
+                for target in node.targets:
+                    if target in joins:
+                        errors.append(
+                            f"{node.name}: routes to join node {joins[target]}"
+                        )
+                if node.end:
+                    errors.append(f"{node.name}: conditional nodes cannot end")
+                continue
+
+            if not isinstance(node, PromptNode):
+                continue
+
+            variables: Set[str] = set(node.variables)
+            if variables - set(node.inputs):
+                errors.append(
+                    f"{node.name}: {sorted(variables - set(node.inputs))} "
+                    "are not declared as inputs"
+                )
+
+            missing: Set[str] = variables - upstream[str(node.id)]
+            if missing:
+                errors.append(
+                    f"{node.name}: {sorted(missing)} are not written by an "
+                    "upstream node"
+                )
+
+        if errors:
+            raise ValueError(f"Invalid flow for Agent {self.name}: {errors}")
+
+    def compile_flow(self) -> Tuple[TypedDict, "CompiledGraph"]:
+        """
+        Builds the state and compiles the LangGraph flow of the nodes
+
+        Returns:
+            - State TypedDict and compiled graph
+        """
+        from langchain_core.runnables import RunnableLambda
+        from langgraph.graph.state import StateGraph
+
+        annotations: Dict = {}
 
         for node in self.nodes:
             if node.output:
                 annotations[node.output.name] = node.output.type
 
-        LOGGER.info(f"Annotations: {annotations}")
-        self.state = TypedDict("AgentState", annotations)
-        graph: StateGraph = StateGraph(self.state)
+        LOGGER.debug("Annotations", extra={"annotations": annotations})
+        state: TypedDict = TypedDict("AgentState", annotations)
+        graph: StateGraph = StateGraph(state)
 
+        # Join nodes get a single edge from all their sources, so they run
+        # once every branch has finished. Other targets of a node run in the
+        # same superstep
+        joins: Set[str] = {str(node.id) for node in self.nodes if node.join}
+        join_sources: Dict[str, List[str]] = defaultdict(list)
         for node in self.nodes:
-            LOGGER.info(f"Adding node: {node.name}")
-            graph.add_node(str(node.id), node.action)
+            LOGGER.debug("Adding node", extra={"node": node.name})
+            graph.add_node(
+                str(node.id),
+                RunnableLambda(
+                    timed(
+                        traced(node.action, f"node.{node.name}"),
+                        str(node.id),
+                        node.name,
+                    ),
+                    afunc=atimed(
+                        atraced(node.aaction, f"node.{node.name}"),
+                        str(node.id),
+                        node.name,
+                    ),
+                ),
+            )
             if node.start:
                 graph.set_entry_point(str(node.id))
             if node.end:
                 graph.set_finish_point(str(node.id))
-            if node.target_id:
-                graph.add_edge(str(node.id), node.target_id)
+            if isinstance(node, ConditionalNode):
+                node.compile()
+                graph.add_conditional_edges(str(node.id), node.route, node.routes)
+                continue
+            for target in node.targets:
+                if target in joins:
+                    join_sources[target].append(str(node.id))
+                else:
+                    graph.add_edge(str(node.id), target)
+
+        for target, sources in join_sources.items():
+            graph.add_edge(sources, target)
 
-        self.memory = MemorySaver()
+        # Checkpointers are shared by every run of a cached graph, so only
+        # persistent ones are used. In-memory checkpoints would pile up
+        return state, graph.compile(checkpointer=self.memory)
 
-        self.graph = graph.compile(checkpointer=self.memory)
+    def to_bundle(self) -> Dict:
+        """
+        Exports the agent and its nodes as a self-contained JSON document, so
+        it can be run without a database. See from_bundle
+        """
+        return {
+            "version": BUNDLE_VERSION,
+            "hash": self.definition_hash(),
+            "exported_at": datetime.now(timezone.utc).isoformat(),
+            "agent": self.model_dump(
+                mode="json",
+                by_alias=True,
+                include={"id", "name", "description", "project_id", "nodes"},
+            ),
+        }
+
+    @classmethod
+    def from_bundle(cls, bundle: Dict) -> "Agent":
+        """
+        Loads an agent exported with to_bundle
+
+        Args:
+            - bundle: Exported agent
+
+        Raises:
+            - ValueError: If the bundle version is not supported, or its
+              nodes do not match its definition hash
+        """
+        if bundle.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported bundle version: {bundle.get('version')}")
+
+        data: Dict = dict(bundle["agent"])
+        nodes: List[BaseNode] = []
+        for node in data.get("nodes", []):
+            if node.get("type") not in NODES_MAP:
+                raise ValueError(f"Unknown node type: {node.get('type')}")
+            nodes.append(NODES_MAP[node["type"]](**node))
+        data["nodes"] = nodes
+        agent: Agent = cls(**data)
+        if agent.definition_hash() != bundle.get("hash"):
+            raise ValueError("Bundle nodes do not match the bundle hash")
+
+        return agent
+
+    # TODO: Add support for messages history
+    def build_flow(self) -> Union[Tuple["CompiledGraph", TypedDict], None]:
+        """
+        Builds a LangGraph flow
+
+        Compiled flows are cached by definition hash, so agents whose nodes
+        did not change are compiled once per process. When memory is set, the
+        flow checkpoints every step with it.
+
+        Args:
+            - nodes: List of nodes
 
-    def run(self) -> Dict:
+        Raises:
+            - ValueError: If the flow is invalid. See validate_flow
+        """
+        LOGGER.info(
+            f"Building flow for Agent: {self.name}", extra={"nodes": len(self.nodes)}
+        )
+        if LOGGER.isEnabledFor(logging.DEBUG):
+            LOGGER.debug("Nodes", extra={"nodes": [node.name for node in self.nodes]})
+
+        if not self.nodes:
+            LOGGER.error("No nodes found")
+            return
+
+        definition_hash: str = self.definition_hash()
+        key: Tuple = (definition_hash, self.memory)
+        cached: Union[Tuple[TypedDict, CompiledGraph], None] = GRAPH_CACHE.get(key)
+        if cached:
+            LOGGER.info(
+                f"Using cached flow {definition_hash[:12]}: {GRAPH_CACHE.stats}"
+            )
+            self.state, self.graph = cached
+            return self.graph, self.state
+
+        with span("build_flow", "agent", agent=self.name, nodes=len(self.nodes)):
+            self.validate_flow()
+            self.state, self.graph = self.compile_flow()
+
+        GRAPH_CACHE.put(key, (self.state, self.graph))
+
+        return self.graph, self.state
+
+    def initial_state(self, inputs: Optional[Dict] = None) -> Dict:
+        """
+        Builds the initial state of a run
+
+        Outputs of input nodes are only set when passed as inputs, so input
+        nodes can tell a passed value, even a falsy one, from a missing one
+
+        Args:
+            - inputs: Values for state keys, e.g. to override input nodes
+        """
+        input_outputs: Set[str] = {
+            node.output.name for node in self.nodes if isinstance(node, InputNode)
+        }
+        state: Dict = {
+            key: "" for key in self.state.__annotations__ if key not in input_outputs
+        }
+        for key, value in (inputs or {}).items():
+            if key not in self.state.__annotations__:
+                LOGGER.warning(f"Ignoring unknown input: {key}")
+                continue
+            state[key] = value
+
+        return state
+
+    def config(self, thread_id: Optional[str] = None) -> "RunnableConfig":
+        """
+        Builds the config of a run
+
+        Run ids are prefixed by the agent id, so a run can be traced back to
+        its agent
+
+        Args:
+            - thread_id: Identifier of the run. A new one is used by default
+        """
+        thread_id = thread_id or f"{self.id}-{uuid4().hex}"
+        LOGGER.info(f"Run ID: {thread_id}")
+
+        return {"configurable": {"thread_id": thread_id}}
+
+    @contextmanager
+    def recording(
+        self, config: "RunnableConfig", inputs: Optional[Dict] = None
+    ) -> Iterator[Union[Run, None]]:
+        """
+        Records a run in the history, if set. The caller sets the output of
+        the yielded run. Node timings are collected while the block runs, and
+        the run is handed to the history writer when it ends, so recording
+        does not wait on the database. Runs stopped by their caller (e.g. a
+        stream closed early, or a cancelled task) are recorded as cancelled
+
+        Args:
+            - config: Config of the run
+            - inputs: Inputs of the run
+        """
+        if not self.history:
+            yield None
+            return
+
+        run: Run = Run(
+            run_id=config["configurable"]["thread_id"],
+            agent_id=str(self.id),
+            inputs=inputs or {},
+            started_at=datetime.now(timezone.utc),
+        )
+        NODE_TIMINGS.set(run.nodes)
+        started: float = perf_counter()
+        try:
+            yield run
+        except (GeneratorExit, asyncio.CancelledError):
+            run.status = Run.Status.CANCELLED
+            raise
+        except BaseException as error:
+            run.status = Run.Status.ERROR
+            run.error = str(error) or type(error).__name__
+            raise
+        finally:
+            NODE_TIMINGS.set(None)
+            run.duration_ms = round((perf_counter() - started) * 1000, 3)
+            self.history.write(run)
+
+    def run(
+        self, inputs: Optional[Dict] = None, thread_id: Optional[str] = None
+    ) -> Dict:
         """
         Runs the Agent
+
+        Args:
+            - inputs: Values for state keys, e.g. to override input nodes
+            - thread_id: Identifier of the run. A new one is used by default
+
+        Returns:
+            - Final state of the run
         """
         LOGGER.info(f"Running Agent: {self.name}")
 
         self.build_flow()
 
-        initial_state = {key: "" for key in self.state.__annotations__}
+        config: RunnableConfig = self.config(thread_id)
+        with self.recording(config, inputs) as run:
+            response = self.graph.invoke(self.initial_state(inputs), config)
+            if run:
+                run.output = response
 
-        response = self.graph.invoke(
-            initial_state, {"configurable": {"thread_id": str(self.id)}}
-        )
+        log_state("Agent response", response)
+
+        return response
+
+    async def arun(
+        self, inputs: Optional[Dict] = None, thread_id: Optional[str] = None
+    ) -> Dict:
+        """
+        Runs the Agent asynchronously, so the process can keep other runs in
+        flight while nodes wait on the network
+
+        Args:
+            - inputs: Values for state keys, e.g. to override input nodes
+            - thread_id: Identifier of the run. A new one is used by default
+
+        Returns:
+            - Final state of the run
+        """
+        LOGGER.info(f"Running Agent: {self.name}")
+
+        self.build_flow()
+
+        config: RunnableConfig = self.config(thread_id)
+        with self.recording(config, inputs) as run:
+            response = await self.graph.ainvoke(self.initial_state(inputs), config)
+            if run:
+                run.output = response
+
+        log_state("Agent response", response)
+
+        return response
+
+    async def astream(
+        self, inputs: Optional[Dict] = None, thread_id: Optional[str] = None
+    ) -> AsyncIterator[Dict]:
+        """
+        Runs the Agent asynchronously, yielding events as they happen
+
+        LLM nodes stream their responses token by token while the flow runs
+        under astream_events, so the first tokens arrive as soon as the first
+        LLM produces them.
+
+        Args:
+            - inputs: Values for state keys, e.g. to override input nodes
+            - thread_id: Identifier of the run. A new one is used by default
+
+        Yields:
+            - {"event": "token", "node": <node id>, "content": <token>}
+            - {"event": "node", "node": <node id>, "output": <state update>}
+            - {"event": "end", "output": <final state>}
+        """
+        LOGGER.info(f"Streaming Agent: {self.name}")
+
+        self.build_flow()
+
+        state: Dict = self.initial_state(inputs)
+        node_ids: Set[str] = {str(node.id) for node in self.nodes}
+        config: RunnableConfig = self.config(thread_id)
+        with self.recording(config, inputs) as run:
+            async for event in self.graph.astream_events(
+                dict(state), config, version="v2"
+            ):
+                node: Optional[str] = event.get("metadata", {}).get("langgraph_node")
+                if event["event"] == "on_chat_model_stream":
+                    content: Any = event["data"]["chunk"].content
+                    if content:
+                        yield {"event": "token", "node": node, "content": content}
+                elif (
+                    event["event"] == "on_chain_end"
+                    and event["name"] == node
+                    and node in node_ids
+                ):
+                    output: Any = event["data"].get("output")
+                    if isinstance(output, dict):
+                        state.update(output)
+                    yield {"event": "node", "node": node, "output": output}
+
+            if run:
+                run.output = state
+
+        yield {"event": "end", "output": state}
+
+    def resume(self, thread_id: str) -> Union[Dict, None]:
+        """
+        Resumes a checkpointed run from its last completed node
+
+        Args:
+            - thread_id: Identifier of the run
+
+        Returns:
+            - Final state of the run
+        """
+        LOGGER.info(f"Resuming Agent: {self.name}")
+        if not self.memory:
+            LOGGER.error("Agent has no checkpointer")
+            return None
+
+        self.build_flow()
+
+        config: RunnableConfig = self.config(thread_id)
+        snapshot: StateSnapshot = self.graph.get_state(config)
+        if not snapshot.created_at:
+            LOGGER.error("Run not found")
+            return None
+
+        if not snapshot.next:
+            LOGGER.info("Run already completed")
+            return snapshot.values
+
+        LOGGER.info(f"Resuming from: {snapshot.next}")
+        with self.recording(config) as run:
+            response = self.graph.invoke(None, config)
+            if run:
+                run.output = response
 
-        LOGGER.info(f"Agent response: {response}")
+        log_state("Agent response", response)
 
-        return self.state
+        return response
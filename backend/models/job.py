@@ -0,0 +1,61 @@
+"""
+Defines model for Job
+"""
+
+from datetime import datetime
+from enum import Enum
+from typing import Dict, Optional
+
+from pydantic import BaseModel, Field
+
+from constants.pyobjectid import PyObjectId
+
+
+class Job(BaseModel):
+    """
+    Represents a queued run of an agent
+
+    Attributes:
+        - agent_id: Identifier of the agent to run
+        - inputs: Values for state keys, e.g. to override input nodes
+        - priority: Jobs with higher priority are claimed first
+        - status: See Job.Status
+        - attempts: Number of times the job was claimed
+        - max_attempts: Claims allowed before the job fails
+        - worker: Identifier of the worker holding the lease
+        - lease_expires_at: When other workers may reclaim the job. Queued
+          jobs can be claimed once it has passed, so failed jobs wait for
+          their retry delay
+        - heartbeat_at: Last lease renewal
+        - run_id: Identifier of the run
+        - output: Final state of the run
+        - error: Error of the last attempt
+        - expires_at: When the finished job is removed
+    """
+
+    class Status(str, Enum):
+        """
+        Enum for job statuses
+        """
+
+        QUEUED = "queued"
+        RUNNING = "running"
+        SUCCESS = "success"
+        ERROR = "error"
+
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    agent_id: str
+    inputs: Dict = Field(default={})
+    priority: int = 0
+    status: Status = Status.QUEUED
+    attempts: int = 0
+    max_attempts: int = 3
+    worker: Optional[str] = None
+    created_at: datetime
+    lease_expires_at: datetime
+    heartbeat_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    run_id: Optional[str] = None
+    output: Optional[Dict] = None
+    error: Optional[str] = None
+    expires_at: Optional[datetime] = None
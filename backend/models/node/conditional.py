@@ -0,0 +1,190 @@
+"""
+Defines conditional node model
+"""
+
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+import re
+
+from langgraph.constants import END
+from pydantic import BaseModel, PrivateAttr
+
+from models.node.main import BaseNode
+from utils.logger import log_state
+
+Predicate = Callable[[Any], bool]
+
+
+def to_number(value: Any) -> Union[float, None]:
+    """
+    Casts a value to a number
+
+    Args:
+        - value: Value to cast
+
+    Returns:
+        - The number, or None if the value is not numeric
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class Condition(BaseModel):
+    """
+    Represents a Condition
+
+    Attributes:
+        - operator: Operator for the condition. See Operator enum.
+        - value: Value for the condition. Ignored by empty and not_empty
+    """
+
+    class Operator(str, Enum):
+        """
+        Enum for Condition Operators
+        """
+
+        eq = "eq"
+        ne = "ne"
+        gt = "gt"
+        gte = "gte"
+        lt = "lt"
+        lte = "lte"
+        contains = "contains"
+        not_contains = "not_contains"
+        startswith = "startswith"
+        endswith = "endswith"
+        regex = "regex"
+        empty = "empty"
+        not_empty = "not_empty"
+
+    operator: Operator
+    value: Optional[str] = ""
+
+    def compile(self) -> Predicate:
+        """
+        Compiles the condition into a predicate over the input value
+
+        The expected value is parsed once (as a number for comparisons, as a
+        pattern for regex), so evaluating the predicate is a single check.
+        """
+        expected: str = self.value or ""
+
+        if self.operator in (
+            Condition.Operator.gt,
+            Condition.Operator.gte,
+            Condition.Operator.lt,
+            Condition.Operator.lte,
+        ):
+            number: Union[float, None] = to_number(expected)
+            if number is None:
+                raise ValueError(f"{self.operator.value} expects a number: {expected}")
+
+            compare: Callable[[float], bool] = {
+                Condition.Operator.gt: lambda value: value > number,
+                Condition.Operator.gte: lambda value: value >= number,
+                Condition.Operator.lt: lambda value: value < number,
+                Condition.Operator.lte: lambda value: value <= number,
+            }[self.operator]
+
+            def predicate(value: Any) -> bool:
+                value = to_number(value)
+                return value is not None and compare(value)
+
+            return predicate
+
+        if self.operator == Condition.Operator.regex:
+            pattern: re.Pattern = re.compile(expected)
+            return lambda value: pattern.search(str(value)) is not None
+
+        return {
+            Condition.Operator.eq: lambda value: str(value) == expected,
+            Condition.Operator.ne: lambda value: str(value) != expected,
+            Condition.Operator.contains: lambda value: expected in str(value),
+            Condition.Operator.not_contains: lambda value: expected not in str(value),
+            Condition.Operator.startswith: lambda value: str(value).startswith(
+                expected
+            ),
+            Condition.Operator.endswith: lambda value: str(value).endswith(expected),
+            Condition.Operator.empty: lambda value: not value,
+            Condition.Operator.not_empty: lambda value: bool(value),
+        }[self.operator]
+
+
+class ConditionalNode(BaseNode):
+    """
+    Represents a Conditional Node
+
+    Routes the flow to the first target whose condition matches the input.
+    When none matches, the flow goes to target_id, or ends if it is not set.
+
+    Attributes:
+        - input: Input for the Conditional Node
+        - conditionals: Conditions by target Node identifier, evaluated in
+          order. See Condition model.
+    """
+
+    input: str
+    conditionals: Dict[str, Condition]
+
+    _predicates: Optional[List[Tuple[str, Predicate]]] = PrivateAttr(default=None)
+
+    @property
+    def targets(self) -> List[str]:
+        """
+        Identifiers of the target Nodes, including the default one
+        """
+        targets: List[str] = list(self.conditionals)
+        if self.target_id and self.target_id not in targets:
+            targets.append(self.target_id)
+
+        return targets
+
+    @property
+    def routes(self) -> Dict[str, str]:
+        """
+        Possible destinations of the node
+        """
+        return {target: target for target in self.targets} | {END: END}
+
+    def compile(self) -> List[Tuple[str, Predicate]]:
+        """
+        Compiles the conditions into predicates, once per node
+        """
+        if self._predicates is None:
+            self._predicates = [
+                (target, condition.compile())
+                for target, condition in self.conditionals.items()
+            ]
+
+        return self._predicates
+
+    def action(self, state: Any) -> Any:
+        """
+        Action to be executed by the node
+
+        Routing happens in route, so the state is not changed unless the node
+        has an output, which gets the selected target. LangGraph rejects empty
+        updates, so None is returned otherwise
+        """
+        log_state("Executing Conditional Node", state, node_id=self.id)
+
+        if not self.output:
+            return None
+
+        return {self.output.name: self.route(state)}
+
+    def route(self, state: Any) -> str:
+        """
+        Selects the next node
+
+        Args:
+            - state: State of the agent
+        """
+        value: Any = state.get(self.input)
+        for target, predicate in self.compile():
+            if predicate(value):
+                return target
+
+        return self.target_id or END
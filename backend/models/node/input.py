@@ -6,6 +6,7 @@ from typing import Any
 
 
 from models.node.main import BaseNode, Output
+from utils.logger import log_state
 
 
 class InputNode(BaseNode):
@@ -23,8 +24,15 @@ class InputNode(BaseNode):
     def action(self, state: Any) -> Any:
         """
         Action to be executed by the node
+
+        A value passed as run inputs for the output takes precedence over the
+        stored value, even if it is falsy. Outputs of input nodes are not
+        pre-filled (see Agent.initial_state), and LangGraph reads unset keys
+        as None, so None means the value was not passed.
         """
-        print(f"Executing Input Node: {self.id}")
-        print(f"State: {state}")
+        log_state("Executing Input Node", state, node_id=self.id)
+
+        if state.get(self.output.name) is not None:
+            return {self.output.name: state[self.output.name]}
 
         return {self.output.name: self.value}
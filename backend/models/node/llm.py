@@ -2,13 +2,18 @@
 Defines llm node model
 """
 
-from typing import Any, Optional
+from typing import Any, Optional, Union
+import asyncio
 
-from langchain.chat_models import init_chat_model
 from pydantic import BaseModel
 
-from constants.model_providers import model_provider
 from models.node.main import BaseNode, Output
+from utils.chat_models import get_chat_model
+from utils.llm_batcher import LLMBatcher, get_llm_batcher
+from utils.llm_cache import LLMCacheBackend, cache_key, get_llm_cache
+from utils.logger import LOGGER, log_state, summarize
+from utils.rate_limiter import estimate_tokens, get_rate_limiter
+from utils.tracing import span
 
 
 class LLMModelSettings(BaseModel):
@@ -24,6 +29,19 @@ class LLMModelSettings(BaseModel):
     temperature: float
 
 
+class LLMCacheSettings(BaseModel):
+    """
+    Represents the response cache settings of a LLM Node
+
+    Attributes:
+        - backend: Store for cached responses. See LLMCacheBackend enum.
+        - ttl: Seconds a cached response is valid for. No expiry by default
+    """
+
+    backend: LLMCacheBackend = LLMCacheBackend.sqlite
+    ttl: Optional[int] = None
+
+
 class LLMNode(BaseNode):
     """
     Represents a LLM Node
@@ -32,31 +50,116 @@ class LLMNode(BaseNode):
         - model: LLMModel. See LLMModel model.
         - inputs: List of inputs to the LLM
         - output: Output of the LLM. See Output model.
+        - cache: Response cache settings. See LLMCacheSettings model. Responses
+          are not cached by default
     """
 
     model: LLMModelSettings
     output: Output  # TODO: Add validation for output name
     input: Optional[str] = None
+    cache: Optional[LLMCacheSettings] = None
 
     # TODO: Add support for tool calls
 
+    def cached(self, prompt: str) -> Union[str, None]:
+        """
+        Gets the cached response to a prompt, if the cache is enabled
+
+        Args:
+            - prompt: Rendered prompt
+        """
+        if not self.cache:
+            return None
+
+        return get_llm_cache(self.cache.backend).lookup(
+            cache_key(self.model.name, self.model.temperature, prompt)
+        )
+
+    def store(self, prompt: str, content: str) -> None:
+        """
+        Caches the response to a prompt, if the cache is enabled
+
+        Args:
+            - prompt: Rendered prompt
+            - content: Response content
+        """
+        if not self.cache:
+            return
+
+        get_llm_cache(self.cache.backend).put(
+            cache_key(self.model.name, self.model.temperature, prompt),
+            content,
+            self.cache.ttl,
+        )
+
     def action(self, state: Any) -> Any:
         """
         Action to be executed by the node
         """
-        print(f"Executing LLM Node: {self.id}")
-        print(f"State: {state}")
+        log_state("Executing LLM Node", state, node_id=self.id)
 
-        model_config = model_provider.get(self.model.name)
-        llm = init_chat_model(
-            model=self.model.name,
-            model_provider=model_config.get("name"),
-            temperature=self.model.temperature,
-            api_key=model_config.get("api_key"),
+        prompt: str = state.get(self.input)
+        content: Union[str, None] = self.cached(prompt)
+        if content is not None:
+            LOGGER.info("LLM response cached", extra={"node_id": self.id})
+            return {self.output.name: content}
+
+        llm = get_chat_model(self.model.name, self.model.temperature)
+        batcher: Union[LLMBatcher, None] = get_llm_batcher(
+            self.model.name, self.model.temperature
+        )
+
+        with span(
+            "llm.request", "llm", model=self.model.name, prompt_bytes=len(str(prompt))
+        ) as args:
+            response = get_rate_limiter(self.model.name).call(
+                (lambda: batcher.submit(prompt).result())
+                if batcher
+                else (lambda: llm.invoke(prompt)),
+                estimate_tokens(prompt),
+            )
+            args["response_bytes"] = len(str(response.content))
+
+        LOGGER.info(
+            "LLM response",
+            extra={"node_id": self.id, "response": summarize(response.content)},
         )
+        self.store(prompt, response.content)
 
-        response = llm.invoke(state.get(self.input))
+        return {self.output.name: response.content}
 
-        print(f"Response: {response}")
+    async def aaction(self, state: Any) -> Any:
+        """
+        Async action to be executed by the node
+        """
+        log_state("Executing LLM Node", state, node_id=self.id)
+
+        prompt: str = state.get(self.input)
+        content: Union[str, None] = await asyncio.to_thread(self.cached, prompt)
+        if content is not None:
+            LOGGER.info("LLM response cached", extra={"node_id": self.id})
+            return {self.output.name: content}
+
+        llm = get_chat_model(self.model.name, self.model.temperature)
+        batcher: Union[LLMBatcher, None] = get_llm_batcher(
+            self.model.name, self.model.temperature
+        )
+
+        with span(
+            "llm.request", "llm", model=self.model.name, prompt_bytes=len(str(prompt))
+        ) as args:
+            response = await get_rate_limiter(self.model.name).acall(
+                (lambda: asyncio.wrap_future(batcher.submit(prompt)))
+                if batcher
+                else (lambda: llm.ainvoke(prompt)),
+                estimate_tokens(prompt),
+            )
+            args["response_bytes"] = len(str(response.content))
+
+        LOGGER.info(
+            "LLM response",
+            extra={"node_id": self.id, "response": summarize(response.content)},
+        )
+        await asyncio.to_thread(self.store, prompt, response.content)
 
         return {self.output.name: response.content}
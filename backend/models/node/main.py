@@ -3,7 +3,7 @@ Defines model for Nodes
 """
 
 from enum import Enum
-from typing import Any, Dict, Optional
+from typing import Any, List, Optional
 
 from pydantic import BaseModel, Field
 from pydantic import ConfigDict
@@ -36,6 +36,8 @@ class BaseNode(BaseModel):
         - start: Indicates if the Node is a start Node
         - end: Indicates if the Node is an end Node
         - target_id: Identifier of the target Node
+        - target_ids: Identifiers of more target Nodes. Targets run in parallel
+        - join: Indicates if the Node waits for all its sources to finish
         - agent_id: Identifier of the Agent
         - output: Output of the Node. See Output model.
     """
@@ -49,15 +51,37 @@ class BaseNode(BaseModel):
     start: Optional[bool] = False
     end: Optional[bool] = False
     target_id: Optional[str] = None
+    target_ids: Optional[List[str]] = []
+    join: Optional[bool] = False
     agent_id: str
     output: Optional["Output"] = None
 
+    @property
+    def targets(self) -> List[str]:
+        """
+        Identifiers of the target Nodes
+        """
+        targets: List[str] = list(self.target_ids or [])
+        if self.target_id and self.target_id not in targets:
+            targets.insert(0, self.target_id)
+
+        return targets
+
     def action(self, state: Any) -> Any:
         """
         Action to be executed by the node
         """
         raise NotImplementedError
 
+    async def aaction(self, state: Any) -> Any:
+        """
+        Async action to be executed by the node
+
+        Defaults to the synchronous action, which is fine for nodes that do
+        not wait on I/O
+        """
+        return self.action(state)
+
 
 class Output(BaseModel):
     """
@@ -82,27 +106,6 @@ class Output(BaseModel):
         json = "json"
 
 
-class Condition(BaseModel):
-    """
-    Represents a Condition
-
-    Attributes:
-        - operator: Operator for the condition. # TODO: Add validation for operator
-        - value: Value for the condition
-    """
-
-    operator: str
-    value: str
-
-
-class ConditionalNode(BaseNode):
-    """
-    Represents a Conditional Node
-
-    Attributes:
-        - input: Input for the Conditional Node
-        - conditionals: List of conditions. See Condition model.
-    """
-
-    input: str
-    conditionals: Dict[str, Condition]
+# Output is defined after BaseNode, so its forward reference is resolved here
+# rather than in every module that defines a node
+BaseNode.model_rebuild()
@@ -2,11 +2,19 @@
 Defines prompt node model
 """
 
-from typing import Any, List, Optional
+from typing import Any, List, Optional, Tuple
+import os
 
-from langchain_core.prompts import PromptTemplate
+from pydantic import PrivateAttr
 
 from models.node.main import BaseNode, Output
+from utils.cache import LRUCache
+from utils.logger import log_state
+
+# Template variables keyed by prompt text and version
+PROMPT_TEMPLATES: LRUCache = LRUCache(
+    int(os.getenv("PROMPT_TEMPLATE_CACHE_SIZE", 1024))
+)
 
 
 class PromptNode(BaseNode):
@@ -24,15 +32,42 @@ class PromptNode(BaseNode):
     inputs: Optional[List[str]] = []
     output: Output
 
+    _variables: Optional[Tuple[str, ...]] = PrivateAttr(default=None)
+
+    @property
+    def variables(self) -> Tuple[str, ...]:
+        """
+        Variables of the prompt template
+
+        The template is parsed once per prompt text and version, and shared
+        across nodes and runs.
+        """
+        if self._variables is None:
+            key: Tuple[str, str] = (self.prompt, self.version)
+            variables: Optional[Tuple[str, ...]] = PROMPT_TEMPLATES.get(key)
+            if variables is None:
+                from langchain_core.prompts import PromptTemplate
+
+                variables = tuple(
+                    PromptTemplate.from_template(template=self.prompt).input_variables
+                )
+                PROMPT_TEMPLATES.put(key, variables)
+
+            self._variables = variables
+
+        return self._variables
+
     def action(self, state: Any) -> Any:
         """
         Action to be executed by the node
+
+        Variables are validated against the inputs when the flow is built, so
+        rendering is a plain format call.
         """
-        print(f"Executing Prompt Node: {self.id}")
-        print(f"State: {state}")
+        log_state("Executing Prompt Node", state, node_id=self.id)
 
-        prompt: str = PromptTemplate.from_template(
-            template=self.prompt,
-        ).format(**{input: state[input] for input in self.inputs})
+        prompt: str = self.prompt.format(
+            **{variable: state[variable] for variable in self.variables}
+        )
 
         return {self.output.name: prompt}
@@ -0,0 +1,132 @@
+"""
+Defines model for Run
+"""
+
+from contextvars import ContextVar
+from datetime import datetime
+from enum import Enum
+from functools import wraps
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from pydantic import BaseModel, Field
+
+from constants.pyobjectid import PyObjectId
+
+# Node timings of the run in progress. Set per run, so concurrent runs
+# (asyncio tasks or threads) record their own nodes
+NODE_TIMINGS: ContextVar[Optional[List["NodeTiming"]]] = ContextVar(
+    "NODE_TIMINGS", default=None
+)
+
+
+class NodeTiming(BaseModel):
+    """
+    Represents the execution of a node in a run
+    """
+
+    node_id: str
+    name: str
+    duration_ms: float
+    error: Optional[str] = None
+
+
+class Run(BaseModel):
+    """
+    Represents a Run of an agent
+    """
+
+    class Status(str, Enum):
+        """
+        Enum for run statuses
+        """
+
+        SUCCESS = "success"
+        ERROR = "error"
+        CANCELLED = "cancelled"
+
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    run_id: str
+    agent_id: str
+    status: Status = Status.SUCCESS
+    inputs: Dict = Field(default={})
+    output: Optional[Dict] = None
+    error: Optional[str] = None
+    nodes: List[NodeTiming] = Field(default=[])
+    started_at: datetime
+    duration_ms: float = 0.0
+    expires_at: Optional[datetime] = None
+
+
+def timed(action: Callable[[Any], Any], node_id: str, name: str) -> Callable:
+    """
+    Wraps a node action to record its duration in the run in progress
+
+    Args:
+        - action: Node action
+        - node_id: Identifier of the node
+        - name: Name of the node
+    """
+
+    @wraps(action)
+    def wrapper(state: Any) -> Any:
+        timings: Optional[List[NodeTiming]] = NODE_TIMINGS.get()
+        if timings is None:
+            return action(state)
+
+        started: float = perf_counter()
+        error: Optional[str] = None
+        try:
+            return action(state)
+        except Exception as exception:
+            error = str(exception)
+            raise
+        finally:
+            timings.append(
+                NodeTiming(
+                    node_id=node_id,
+                    name=name,
+                    duration_ms=round((perf_counter() - started) * 1000, 3),
+                    error=error,
+                )
+            )
+
+    return wrapper
+
+
+def atimed(
+    action: Callable[[Any], Awaitable[Any]], node_id: str, name: str
+) -> Callable:
+    """
+    Async version of timed
+
+    Args:
+        - action: Async node action
+        - node_id: Identifier of the node
+        - name: Name of the node
+    """
+
+    @wraps(action)
+    async def wrapper(state: Any) -> Any:
+        timings: Optional[List[NodeTiming]] = NODE_TIMINGS.get()
+        if timings is None:
+            return await action(state)
+
+        started: float = perf_counter()
+        error: Optional[str] = None
+        try:
+            return await action(state)
+        except Exception as exception:
+            error = str(exception)
+            raise
+        finally:
+            timings.append(
+                NodeTiming(
+                    node_id=node_id,
+                    name=name,
+                    duration_ms=round((perf_counter() - started) * 1000, 3),
+                    error=error,
+                )
+            )
+
+    return wrapper
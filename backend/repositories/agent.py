@@ -2,16 +2,31 @@
 Defines repository for Agent collection
 """
 
+from collections import defaultdict
 from types import SimpleNamespace
-from typing import Dict, Union
+from typing import TYPE_CHECKING, Dict, List, Union
 
 from bson.objectid import ObjectId
-from pymongo import ASCENDING
+from pymongo import ASCENDING, IndexModel
 from pymongo.collection import Collection
 
 from models.agent import Agent
 from models.project import Project
 from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorCollection
+
+
+# project_id leads so lookups by project use the same index as the name uniqueness
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.AGENTS,
+    version=2,
+    indexes=[
+        IndexModel([("project_id", ASCENDING), ("name", ASCENDING)], unique=True)
+    ],
+)
 
 
 class AgentRepository:
@@ -26,9 +41,7 @@ class AgentRepository:
             MongoEnum.Database.AGENT_00
         ][MongoEnum.Collection.AGENTS]
 
-        self.__collection.create_index(
-            [("name", ASCENDING), ("project_id", ASCENDING)], unique=True
-        )
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.AGENTS)
 
     def create(self, agent: Agent) -> bool:
         """
@@ -58,33 +71,92 @@ class AgentRepository:
 
         return result.inserted_id is not None
 
-    def get(self, agent_id: str) -> Union[Agent, None]:
+    def get(
+        self,
+        agent_id: str,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> Union[Agent, None]:
         """
         Gets an Agent by ID
 
         Args:
             - agent_id: Agent ID
+            - hydration: Strategy to load the nodes of the agent
         """
         self.__context.logger.info(f"Getting agent with ID: {agent_id}")
-        # Avoid circular imports
-        from repositories.node import NodeRepository
 
-        agent_data = self.__collection.find_one({"_id": ObjectId(agent_id)})
-        if not agent_data:
+        agents: List[Agent] = self.get_all(
+            {"_id": ObjectId(agent_id)}, hydration=hydration
+        )
+        if not agents:
             self.__context.logger.warning("Agent not found")
             return None
 
-        node_repository: NodeRepository = NodeRepository(self.__context)
-        agent_data["nodes"] = node_repository.get_all({"agent_id": agent_id})
+        return agents[0]
+
+    @staticmethod
+    def lookup_stage() -> Dict:
+        """
+        Builds a $lookup stage that joins the agents of a project, including
+        their nodes
 
-        return Agent(**agent_data)
+        Agents store project_id as a string, so the project _id is cast before
+        matching.
+        """
+        # Avoid circular imports
+        from repositories.node import NodeRepository
 
-    def get_all(self, query: Dict, project: Union[Dict, None] = None) -> list[Agent]:
+        return {
+            "$lookup": {
+                "from": MongoEnum.Collection.AGENTS.value,
+                "let": {"project_id": {"$toString": "$_id"}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$project_id", "$$project_id"]}}},
+                    NodeRepository.lookup_stage(),
+                ],
+                "as": "agents",
+            }
+        }
+
+    @staticmethod
+    def query_shapes(seed: SimpleNamespace) -> List[Dict]:
+        """
+        Query shapes issued against the agents collection, used to check that
+        they are served by an index
+
+        Args:
+            - seed: Identifiers of seeded documents (project_id, agent_id, node_id)
+        """
+        # Avoid circular imports
+        from repositories.node import NodeRepository
+
+        return [
+            {"filter": {"_id": ObjectId(seed.agent_id)}},
+            {"filter": {"project_id": seed.project_id}},
+            {"filter": {"project_id": {"$in": [seed.project_id]}}},
+            {
+                "pipeline": [
+                    {"$match": {"_id": ObjectId(seed.agent_id)}},
+                    NodeRepository.lookup_stage(),
+                ]
+            },
+        ]
+
+    def get_all(
+        self,
+        query: Dict,
+        project: Union[Dict, None] = None,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> List[Agent]:
         """
         Gets all Agents
 
         Args:
             - query: Query to filter Agents
+            - project: Projection query
+            - hydration: Strategy to load the nodes of the agents. LOOKUP
+              issues a single aggregation, BATCH issues one query for agents
+              and one for all their nodes
         """
         self.__context.logger.info("Getting all agents...")
         self.__context.logger.info(f"Query: {query}")
@@ -92,11 +164,32 @@ class AgentRepository:
         # Avoid circular imports
         from repositories.node import NodeRepository
 
+        if hydration == MongoEnum.Hydration.LOOKUP:
+            pipeline: List[Dict] = [{"$match": query}, NodeRepository.lookup_stage()]
+            if project:
+                pipeline.append({"$project": project})
+
+            agents = list(self.__collection.aggregate(pipeline))
+            for agent in agents:
+                agent["nodes"] = [
+                    NodeRepository.to_node(node) for node in agent.get("nodes", [])
+                ]
+
+            return [Agent(**agent) for agent in agents]
+
         agents = list(self.__collection.find(query, project))
+        if not agents:
+            return []
 
         node_repository: NodeRepository = NodeRepository(self.__context)
+        nodes: Dict[str, List] = defaultdict(list)
+        for node in node_repository.get_all(
+            {"agent_id": {"$in": [str(agent["_id"]) for agent in agents]}}
+        ):
+            nodes[node.agent_id].append(node)
+
         for agent in agents:
-            agent["nodes"] = node_repository.get_all({"agent_id": str(agent["_id"])})
+            agent["nodes"] = nodes.get(str(agent["_id"]), [])
 
         return [Agent(**agent) for agent in agents]
 
@@ -130,3 +223,93 @@ class AgentRepository:
             return False
 
         return True
+
+
+class AsyncAgentRepository:
+    """
+    Asynchronous repository for Agent collection
+
+    Covers the read paths used to run agents. Indexes are ensured by
+    AgentRepository or `cli.py db migrate`.
+    """
+
+    def __init__(self, context: SimpleNamespace):
+        self.__context: SimpleNamespace = context
+
+        self.__collection: "AsyncIOMotorCollection" = (
+            self.__context.async_mongodb_client[MongoEnum.Database.AGENT_00][
+                MongoEnum.Collection.AGENTS
+            ]
+        )
+
+    async def get(
+        self,
+        agent_id: str,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> Union[Agent, None]:
+        """
+        Gets an Agent by ID
+
+        Args:
+            - agent_id: Agent ID
+            - hydration: Strategy to load the nodes of the agent
+        """
+        self.__context.logger.info(f"Getting agent with ID: {agent_id}")
+
+        agents: List[Agent] = await self.get_all(
+            {"_id": ObjectId(agent_id)}, hydration=hydration
+        )
+        if not agents:
+            self.__context.logger.warning("Agent not found")
+            return None
+
+        return agents[0]
+
+    async def get_all(
+        self,
+        query: Dict,
+        project: Union[Dict, None] = None,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> List[Agent]:
+        """
+        Gets all Agents
+
+        Args:
+            - query: Query to filter Agents
+            - project: Projection query
+            - hydration: Strategy to load the nodes of the agents
+        """
+        self.__context.logger.info("Getting all agents...")
+        self.__context.logger.info(f"Query: {query}")
+
+        # Avoid circular imports
+        from repositories.node import AsyncNodeRepository, NodeRepository
+
+        if hydration == MongoEnum.Hydration.LOOKUP:
+            pipeline: List[Dict] = [{"$match": query}, NodeRepository.lookup_stage()]
+            if project:
+                pipeline.append({"$project": project})
+
+            agents = await self.__collection.aggregate(pipeline).to_list(length=None)
+            for agent in agents:
+                agent["nodes"] = [
+                    NodeRepository.to_node(node) for node in agent.get("nodes", [])
+                ]
+
+            return [Agent(**agent) for agent in agents]
+
+        agents = await self.__collection.find(query, project).to_list(length=None)
+        if not agents:
+            return []
+
+        node_repository: AsyncNodeRepository = AsyncNodeRepository(self.__context)
+        nodes: Dict[str, List] = defaultdict(list)
+        for node in await node_repository.get_all(
+            {"agent_id": {"$in": [str(agent["_id"]) for agent in agents]}}
+        ):
+            nodes[node.agent_id].append(node)
+
+        for agent in agents:
+            agent["nodes"] = nodes.get(str(agent["_id"]), [])
+
+        return [Agent(**agent) for agent in agents]
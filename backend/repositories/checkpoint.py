@@ -0,0 +1,329 @@
+"""
+Defines repository for Checkpoint collections
+
+Implements a LangGraph checkpointer backed by MongoDB, so the state of a run
+survives the process and a failed run can be resumed from its last completed
+node instead of starting over.
+"""
+
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from typing import Any, AsyncIterator, Dict, Iterator, List, Optional, Sequence, Tuple
+import asyncio
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+from pymongo import ASCENDING, DESCENDING, IndexModel, UpdateOne
+from pymongo.collection import Collection
+
+from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
+from utils.tracing import span
+
+
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.CHECKPOINTS,
+    version=1,
+    indexes=[
+        IndexModel(
+            [
+                ("thread_id", ASCENDING),
+                ("checkpoint_ns", ASCENDING),
+                ("checkpoint_id", DESCENDING),
+            ],
+            unique=True,
+        )
+    ],
+)
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.CHECKPOINT_WRITES,
+    version=1,
+    indexes=[
+        IndexModel(
+            [
+                ("thread_id", ASCENDING),
+                ("checkpoint_ns", ASCENDING),
+                ("checkpoint_id", ASCENDING),
+                ("task_id", ASCENDING),
+                ("idx", ASCENDING),
+            ],
+            unique=True,
+        )
+    ],
+)
+
+
+class CheckpointRepository(BaseCheckpointSaver):
+    """
+    Repository for Checkpoint collections
+
+    Checkpoints and pending writes are stored with the checkpointer serializer
+    as binary payloads. Checkpoint ids are time ordered, so the latest
+    checkpoint of a thread is the one with the greatest id.
+    """
+
+    def __init__(self, context: SimpleNamespace) -> None:
+        super().__init__()
+        self.__context: SimpleNamespace = context
+
+        database = self.__context.mongodb_client[MongoEnum.Database.AGENT_00]
+        self.__checkpoints: Collection = database[MongoEnum.Collection.CHECKPOINTS]
+        self.__writes: Collection = database[MongoEnum.Collection.CHECKPOINT_WRITES]
+
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.CHECKPOINTS)
+        ensure_indexes(
+            self.__context.mongodb_client, MongoEnum.Collection.CHECKPOINT_WRITES
+        )
+
+    @staticmethod
+    def __key(config: RunnableConfig) -> Dict:
+        """
+        Builds the thread and namespace filter of a config
+
+        Args:
+            - config: Runnable config
+        """
+        return {
+            "thread_id": config["configurable"]["thread_id"],
+            "checkpoint_ns": config["configurable"].get("checkpoint_ns", ""),
+        }
+
+    def __to_tuple(self, checkpoint: Dict) -> CheckpointTuple:
+        """
+        Builds a checkpoint tuple from a checkpoint document, including its
+        pending writes
+
+        Args:
+            - checkpoint: Checkpoint document
+        """
+        key: Dict = {
+            "thread_id": checkpoint["thread_id"],
+            "checkpoint_ns": checkpoint["checkpoint_ns"],
+        }
+        writes = self.__writes.find(
+            {**key, "checkpoint_id": checkpoint["checkpoint_id"]},
+            sort=[("task_id", ASCENDING), ("idx", ASCENDING)],
+        )
+
+        return CheckpointTuple(
+            config={
+                "configurable": {**key, "checkpoint_id": checkpoint["checkpoint_id"]}
+            },
+            checkpoint=self.serde.loads_typed(
+                (checkpoint["type"], checkpoint["checkpoint"])
+            ),
+            metadata=self.serde.loads(checkpoint["metadata"]),
+            parent_config=(
+                {
+                    "configurable": {
+                        **key,
+                        "checkpoint_id": checkpoint["parent_checkpoint_id"],
+                    }
+                }
+                if checkpoint.get("parent_checkpoint_id")
+                else None
+            ),
+            pending_writes=[
+                (
+                    write["task_id"],
+                    write["channel"],
+                    self.serde.loads_typed((write["type"], write["value"])),
+                )
+                for write in writes
+            ],
+        )
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Gets a checkpoint, the latest of the thread unless the config sets a
+        checkpoint_id
+
+        Args:
+            - config: Runnable config
+        """
+        query: Dict = self.__key(config)
+        checkpoint_id: Optional[str] = get_checkpoint_id(config)
+        if checkpoint_id:
+            query["checkpoint_id"] = checkpoint_id
+
+        checkpoint = self.__checkpoints.find_one(
+            query, sort=[("checkpoint_id", DESCENDING)]
+        )
+        if not checkpoint:
+            return None
+
+        return self.__to_tuple(checkpoint)
+
+    def list(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> Iterator[CheckpointTuple]:
+        """
+        Lists checkpoints from newest to oldest
+
+        Args:
+            - config: Runnable config with the thread to list
+            - filter: Metadata values the checkpoints must match
+            - before: Only list checkpoints older than this one
+            - limit: Maximum number of checkpoints
+        """
+        query: Dict = {}
+        if config:
+            query["thread_id"] = config["configurable"]["thread_id"]
+            if "checkpoint_ns" in config["configurable"]:
+                query["checkpoint_ns"] = config["configurable"]["checkpoint_ns"]
+        if before:
+            query["checkpoint_id"] = {"$lt": get_checkpoint_id(before)}
+
+        count: int = 0
+        for checkpoint in self.__checkpoints.find(
+            query, sort=[("checkpoint_id", DESCENDING)]
+        ):
+            checkpoint_tuple: CheckpointTuple = self.__to_tuple(checkpoint)
+            if filter and any(
+                checkpoint_tuple.metadata.get(key) != value
+                for key, value in filter.items()
+            ):
+                continue
+
+            yield checkpoint_tuple
+            count += 1
+            if limit and count >= limit:
+                break
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Stores a checkpoint
+
+        Args:
+            - config: Runnable config of the parent checkpoint
+            - checkpoint: Checkpoint to store
+            - metadata: Checkpoint metadata
+            - new_versions: Channel versions written in this checkpoint
+        """
+        key: Dict = self.__key(config)
+        type, serialized = self.serde.dumps_typed(checkpoint)
+        with span("checkpoint.put", "checkpoint", bytes=len(serialized)):
+            self.__checkpoints.update_one(
+                {**key, "checkpoint_id": checkpoint["id"]},
+                {
+                    "$set": {
+                        "parent_checkpoint_id": config["configurable"].get(
+                            "checkpoint_id"
+                        ),
+                        "type": type,
+                        "checkpoint": serialized,
+                        "metadata": self.serde.dumps(metadata),
+                        "created_at": datetime.now(timezone.utc),
+                    }
+                },
+                upsert=True,
+            )
+
+        return {"configurable": {**key, "checkpoint_id": checkpoint["id"]}}
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        """
+        Stores the writes of a task, so completed tasks are not executed again
+        when the run is resumed
+
+        Args:
+            - config: Runnable config of the checkpoint
+            - writes: Channel and value of each write
+            - task_id: Identifier of the task
+        """
+        if not writes:
+            return
+
+        key: Dict = {
+            **self.__key(config),
+            "checkpoint_id": config["configurable"]["checkpoint_id"],
+            "task_id": task_id,
+        }
+        operations: List[UpdateOne] = []
+        size: int = 0
+        for idx, (channel, value) in enumerate(writes):
+            type, serialized = self.serde.dumps_typed(value)
+            size += len(serialized)
+            operations.append(
+                UpdateOne(
+                    {**key, "idx": idx},
+                    {"$set": {"channel": channel, "type": type, "value": serialized}},
+                    upsert=True,
+                )
+            )
+
+        with span(
+            "checkpoint.put_writes", "checkpoint", writes=len(operations), bytes=size
+        ):
+            self.__writes.bulk_write(operations, ordered=False)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        """
+        Async version of get_tuple. Runs on a worker thread
+        """
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        """
+        Async version of list. Runs on a worker thread
+        """
+        checkpoints: List[CheckpointTuple] = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        """
+        Async version of put. Runs on a worker thread
+        """
+        return await asyncio.to_thread(
+            self.put, config, checkpoint, metadata, new_versions
+        )
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        """
+        Async version of put_writes. Runs on a worker thread
+        """
+        await asyncio.to_thread(self.put_writes, config, writes, task_id)
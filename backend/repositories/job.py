@@ -0,0 +1,284 @@
+"""
+Defines repository for Job collection
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Union
+import os
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING, IndexModel, ReturnDocument
+from pymongo.collection import Collection
+
+from models.job import Job
+from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
+
+
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.JOBS,
+    version=1,
+    indexes=[
+        # Claims match on status, sort by priority and age, then filter on
+        # lease expiry
+        IndexModel(
+            [
+                ("status", ASCENDING),
+                ("priority", DESCENDING),
+                ("created_at", ASCENDING),
+                ("lease_expires_at", ASCENDING),
+            ]
+        ),
+        # Finished jobs are removed by the server once their retention is over
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+)
+
+
+class JobRepository:
+    """
+    Repository for Job collection
+
+    Jobs are claimed atomically with find_one_and_update, so any number of
+    workers can share the queue. A claim holds a lease that the worker renews
+    with heartbeats. Every claim increments attempts, which identifies the
+    claim in later updates, so a worker that lost its lease cannot update the
+    job again, even when the job was reclaimed by the same worker process. Jobs whose lease expired (e.g. their worker crashed) are
+    claimed again until max_attempts is reached. Failed jobs are retried
+    after a delay that doubles with every attempt, from JOBS_RETRY_DELAY
+    seconds (default: 5) up to JOBS_RETRY_MAX_DELAY (default: 300). Finished
+    jobs are kept for JOBS_RETENTION_DAYS (default: 7, 0 keeps them forever).
+    """
+
+    def __init__(self, context: SimpleNamespace):
+        self.__context: SimpleNamespace = context
+
+        self.__collection: Collection = self.__context.mongodb_client[
+            MongoEnum.Database.AGENT_00
+        ][MongoEnum.Collection.JOBS]
+
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.JOBS)
+
+    def create(
+        self,
+        agent_id: str,
+        inputs: List[Dict],
+        priority: int = 0,
+        max_attempts: int = 3,
+    ) -> List[Job]:
+        """
+        Queues one job per inputs
+
+        Args:
+            - agent_id: Identifier of the agent
+            - inputs: Inputs of each job
+            - priority (optional): Jobs with higher priority are claimed first
+            - max_attempts (optional): Claims allowed before a job fails
+        """
+        self.__context.logger.info(f"Queueing {len(inputs)} jobs...")
+
+        now: datetime = datetime.now(timezone.utc)
+        jobs: List[Job] = [
+            Job(
+                agent_id=agent_id,
+                inputs=job_inputs,
+                priority=priority,
+                max_attempts=max_attempts,
+                created_at=now,
+                lease_expires_at=now,
+            )
+            for job_inputs in inputs
+        ]
+        if not jobs:
+            return []
+
+        result = self.__collection.insert_many(
+            [job.model_dump(by_alias=True, exclude={"id"}) for job in jobs]
+        )
+        for job, job_id in zip(jobs, result.inserted_ids):
+            job.id = job_id
+
+        self.__context.logger.info("Jobs queued")
+
+        return jobs
+
+    def get(self, job_id: str) -> Union[Job, None]:
+        """
+        Get a job by ID
+
+        Args:
+            - job_id: Job ID
+        """
+        self.__context.logger.info(f"Getting job with ID: {job_id}...")
+
+        job: Union[Dict, None] = self.__collection.find_one({"_id": ObjectId(job_id)})
+        if not job:
+            self.__context.logger.warning("Job not found")
+            return None
+
+        return Job(**job)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Number of jobs per status
+        """
+        return {
+            stat["_id"]: stat["count"]
+            for stat in self.__collection.aggregate(
+                [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+            )
+        }
+
+    def claim(self, worker: str, lease: float) -> Union[Job, None]:
+        """
+        Claims the next job: the queued or expired one with the highest
+        priority, oldest first. Jobs waiting for a retry are skipped until
+        their delay is over
+
+        Args:
+            - worker: Identifier of the worker
+            - lease: Seconds the job is held before other workers may reclaim it
+
+        Returns:
+            - The claimed job, if any
+        """
+        while True:
+            now: datetime = datetime.now(timezone.utc)
+            job: Union[Dict, None] = self.__collection.find_one_and_update(
+                {
+                    "status": {"$in": [Job.Status.QUEUED, Job.Status.RUNNING]},
+                    "lease_expires_at": {"$lte": now},
+                },
+                {
+                    "$set": {
+                        "status": Job.Status.RUNNING,
+                        "worker": worker,
+                        "lease_expires_at": now + timedelta(seconds=lease),
+                        "heartbeat_at": now,
+                    },
+                    "$inc": {"attempts": 1},
+                },
+                sort=[("priority", DESCENDING), ("created_at", ASCENDING)],
+                return_document=ReturnDocument.AFTER,
+            )
+            if not job:
+                return None
+
+            claimed: Job = Job(**job)
+            if claimed.attempts <= claimed.max_attempts:
+                return claimed
+
+            # The lease expired on every attempt, e.g. the job crashes workers
+            self.__context.logger.warning(f"Job {claimed.id} exceeded its attempts")
+            self.fail(claimed, worker, claimed.error or "Lease expired", retry=False)
+
+    def heartbeat(self, job: Job, worker: str, lease: float) -> bool:
+        """
+        Renews the lease of a job
+
+        Args:
+            - job: Job data
+            - worker: Identifier of the worker holding the lease
+            - lease: Seconds to extend the lease by
+
+        Returns:
+            - Whether the worker still holds the lease
+        """
+        now: datetime = datetime.now(timezone.utc)
+        result = self.__collection.update_one(
+            {**self.__owned(job, worker), "status": Job.Status.RUNNING},
+            {
+                "$set": {
+                    "lease_expires_at": now + timedelta(seconds=lease),
+                    "heartbeat_at": now,
+                }
+            },
+        )
+
+        return result.matched_count == 1
+
+    def complete(self, job: Job, worker: str, run_id: str, output: Dict) -> bool:
+        """
+        Marks a job as successful
+
+        Args:
+            - job: Job data
+            - worker: Identifier of the worker holding the lease
+            - run_id: Identifier of the run
+            - output: Final state of the run
+
+        Returns:
+            - Whether the worker still held the lease
+        """
+        return self.__finish(
+            job,
+            worker,
+            {"status": Job.Status.SUCCESS, "run_id": run_id, "output": output},
+        )
+
+    def fail(self, job: Job, worker: str, error: str, retry: bool = True) -> bool:
+        """
+        Queues a failed job again after a delay, or marks it as failed when
+        it has no attempts left
+
+        Args:
+            - job: Job data
+            - worker: Identifier of the worker holding the lease
+            - error: Error of the attempt
+            - retry (optional): Whether the job may be claimed again
+
+        Returns:
+            - Whether the worker still held the lease
+        """
+        if retry and job.attempts < job.max_attempts:
+            now: datetime = datetime.now(timezone.utc)
+            delay: float = min(
+                float(os.getenv("JOBS_RETRY_DELAY", 5)) * 2 ** max(job.attempts - 1, 0),
+                float(os.getenv("JOBS_RETRY_MAX_DELAY", 300)),
+            )
+            result = self.__collection.update_one(
+                self.__owned(job, worker),
+                {
+                    "$set": {
+                        "status": Job.Status.QUEUED,
+                        "worker": None,
+                        # Claims skip jobs until their lease expires
+                        "lease_expires_at": now + timedelta(seconds=delay),
+                        "error": error,
+                    }
+                },
+            )
+
+            return result.matched_count == 1
+
+        return self.__finish(job, worker, {"status": Job.Status.ERROR, "error": error})
+
+    def __finish(self, job: Job, worker: str, update: Dict) -> bool:
+        """
+        Sets the final status of a job
+
+        Args:
+            - job: Job data
+            - worker: Identifier of the worker holding the lease
+            - update: Fields to set
+        """
+        now: datetime = datetime.now(timezone.utc)
+        retention: int = int(os.getenv("JOBS_RETENTION_DAYS", 7))
+        update["finished_at"] = now
+        update["expires_at"] = now + timedelta(days=retention) if retention else None
+        result = self.__collection.update_one(
+            self.__owned(job, worker), {"$set": update}
+        )
+
+        return result.matched_count == 1
+
+    def __owned(self, job: Job, worker: str) -> Dict:
+        """
+        Filter matching a job only while the claim it was read with holds it
+
+        Args:
+            - job: Job data, as returned by claim
+            - worker: Identifier of the worker holding the lease
+        """
+        return {"_id": job.id, "worker": worker, "attempts": job.attempts}
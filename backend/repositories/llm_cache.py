@@ -0,0 +1,121 @@
+"""
+Defines repository for LLM cache collection
+"""
+
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Dict, List, Union
+
+from pymongo import ASCENDING, IndexModel, ReturnDocument
+from pymongo.collection import Collection
+
+from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
+from utils.llm_cache import BaseLLMCache
+
+
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.LLM_CACHE,
+    version=1,
+    indexes=[
+        # Expired responses are removed by the server
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+        IndexModel([("accessed_at", ASCENDING)]),
+    ],
+)
+
+
+class LLMCacheRepository(BaseLLMCache):
+    """
+    Repository for LLM cache collection
+
+    Shares cached responses across processes and hosts. Least recently used
+    responses are evicted every `EVICTION_INTERVAL` writes once the
+    collection holds more than max_entries responses.
+    """
+
+    EVICTION_INTERVAL: int = 100
+
+    def __init__(self, context: SimpleNamespace, max_entries: int) -> None:
+        super().__init__()
+        self.__context: SimpleNamespace = context
+        self.__max_entries: int = max_entries
+        self.__writes: int = 0
+
+        self.__collection: Collection = self.__context.mongodb_client[
+            MongoEnum.Database.AGENT_00
+        ][MongoEnum.Collection.LLM_CACHE]
+
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.LLM_CACHE)
+
+    def get(self, key: str) -> Union[str, None]:
+        """
+        Gets a cached response, if present and not expired
+
+        Args:
+            - key: Cache key
+        """
+        now: datetime = datetime.now(timezone.utc)
+        response: Union[Dict, None] = self.__collection.find_one_and_update(
+            {
+                "_id": key,
+                "$or": [{"expires_at": None}, {"expires_at": {"$gt": now}}],
+            },
+            {"$set": {"accessed_at": now}},
+            projection={"value": 1},
+            return_document=ReturnDocument.AFTER,
+        )
+        if not response:
+            return None
+
+        return response["value"]
+
+    def put(self, key: str, value: str, ttl: Union[int, None] = None) -> None:
+        """
+        Stores a response
+
+        Args:
+            - key: Cache key
+            - value: Response content
+            - ttl: Seconds the response is valid for. No expiry by default
+        """
+        now: datetime = datetime.now(timezone.utc)
+        self.__collection.update_one(
+            {"_id": key},
+            {
+                "$set": {
+                    "value": value,
+                    "expires_at": now + timedelta(seconds=ttl) if ttl else None,
+                    "accessed_at": now,
+                }
+            },
+            upsert=True,
+        )
+
+        self.__writes += 1
+        if self.__writes % self.EVICTION_INTERVAL == 0:
+            self.evict()
+
+    def evict(self) -> int:
+        """
+        Removes the least recently used responses above max_entries
+
+        Returns:
+            - Number of responses removed
+        """
+        excess: int = self.__collection.estimated_document_count() - self.__max_entries
+        if excess <= 0:
+            return 0
+
+        keys: List[str] = [
+            response["_id"]
+            for response in self.__collection.find(
+                {},
+                projection={"_id": 1},
+                sort=[("accessed_at", ASCENDING)],
+                limit=excess,
+            )
+        ]
+        self.__context.logger.info(f"Evicting {len(keys)} cached LLM responses")
+
+        return self.__collection.delete_many({"_id": {"$in": keys}}).deleted_count
@@ -3,23 +3,28 @@ Defines repository for Node collection
 """
 
 from types import SimpleNamespace
-from typing import List, Union
-import os
+from typing import TYPE_CHECKING, Dict, List, Union
 
 from bson import ObjectId
-from pymongo import ASCENDING
+from pymongo import ASCENDING, IndexModel
 from pymongo.collection import Collection
 
-from models.node.input import InputNode
-from models.node.main import BaseNode, NodeType
-from models.node.llm import LLMNode
-from models.node.prompt import PromptNode
+from models.agent import NODES_MAP
+from models.node.main import BaseNode
+from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
 
-NODES_MAP = {
-    NodeType.input: InputNode,
-    NodeType.llm: LLMNode,
-    NodeType.prompt: PromptNode,
-}
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorCollection
+
+# agent_id leads so lookups by agent use the same index as the name uniqueness
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.NODES,
+    version=2,
+    indexes=[
+        IndexModel([("agent_id", ASCENDING), ("name", ASCENDING)], unique=True)
+    ],
+)
 
 
 class NodeRepository:
@@ -30,12 +35,10 @@ class NodeRepository:
     def __init__(self, context: SimpleNamespace) -> None:
         self.__context: SimpleNamespace = context
         self.__collection: Collection = self.__context.mongodb_client[
-            os.getenv("MONGODB_DATABASE")
-        ]["nodes"]
+            MongoEnum.Database.AGENT_00
+        ][MongoEnum.Collection.NODES]
 
-        self.__collection.create_index(
-            [("name", ASCENDING), ("agent_id", ASCENDING)], unique=True
-        )
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.NODES)
 
     def create(self, node: BaseNode) -> bool:
         """
@@ -88,8 +91,52 @@ class NodeRepository:
 
         self.__context.logger.info("Node found")
 
+        return self.to_node(node)
+
+    @staticmethod
+    def to_node(node: Dict) -> BaseNode:
+        """
+        Builds the node model matching the node type
+
+        Args:
+            - node: Raw node document
+        """
         return NODES_MAP.get(node.get("type"), {})(**node)
 
+    @staticmethod
+    def lookup_stage() -> Dict:
+        """
+        Builds a $lookup stage that joins the nodes of an agent
+
+        Nodes store agent_id as a string, so the agent _id is cast before
+        matching.
+        """
+        return {
+            "$lookup": {
+                "from": MongoEnum.Collection.NODES.value,
+                "let": {"agent_id": {"$toString": "$_id"}},
+                "pipeline": [
+                    {"$match": {"$expr": {"$eq": ["$agent_id", "$$agent_id"]}}}
+                ],
+                "as": "nodes",
+            }
+        }
+
+    @staticmethod
+    def query_shapes(seed: SimpleNamespace) -> List[Dict]:
+        """
+        Query shapes issued against the nodes collection, used to check that
+        they are served by an index
+
+        Args:
+            - seed: Identifiers of seeded documents (project_id, agent_id, node_id)
+        """
+        return [
+            {"filter": {"_id": ObjectId(seed.node_id)}},
+            {"filter": {"agent_id": seed.agent_id}},
+            {"filter": {"agent_id": {"$in": [seed.agent_id]}}},
+        ]
+
     def get_all(self, query: dict, project: Union[dict, None] = None) -> List[BaseNode]:
         """
         Get all nodes
@@ -106,7 +153,7 @@ class NodeRepository:
             self.__context.logger.warning("Nodes not found")
             return []
 
-        return [NODES_MAP.get(node.get("type"), {})(**node) for node in nodes]
+        return [self.to_node(node) for node in nodes]
 
     def update(self, node_id: str, update: dict) -> bool:
         """
@@ -129,3 +176,53 @@ class NodeRepository:
         self.__context.logger.info("Node updated")
 
         return True
+
+
+class AsyncNodeRepository:
+    """
+    Asynchronous repository for Node collection
+
+    Covers the read paths used to run agents. Indexes are ensured by
+    NodeRepository or `cli.py db migrate`.
+    """
+
+    def __init__(self, context: SimpleNamespace) -> None:
+        self.__context: SimpleNamespace = context
+        self.__collection: "AsyncIOMotorCollection" = (
+            self.__context.async_mongodb_client[MongoEnum.Database.AGENT_00][
+                MongoEnum.Collection.NODES
+            ]
+        )
+
+    async def get(self, node_id: str) -> Union[BaseNode, None]:
+        """
+        Get a node by ID
+
+        Args:
+            - node_id: Node ID
+        """
+        self.__context.logger.info(f"Getting node with ID: {node_id}...")
+
+        node = await self.__collection.find_one({"_id": ObjectId(node_id)})
+        if not node:
+            self.__context.logger.warning("Node not found")
+            return None
+
+        return NodeRepository.to_node(node)
+
+    async def get_all(
+        self, query: dict, project: Union[dict, None] = None
+    ) -> List[BaseNode]:
+        """
+        Get all nodes
+
+        Args:
+            - query: filter query
+            - project: projection query
+        """
+        self.__context.logger.info("Getting all nodes...")
+        self.__context.logger.info(f"Query: {query}")
+
+        nodes = await self.__collection.find(query, project).to_list(length=None)
+
+        return [NodeRepository.to_node(node) for node in nodes]
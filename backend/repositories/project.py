@@ -2,15 +2,28 @@
 Defines repository for Project collection
 """
 
+from collections import defaultdict
 from types import SimpleNamespace
-from typing import Dict, List, Union
+from typing import TYPE_CHECKING, Dict, List, Union
 
 from bson import ObjectId
+from pymongo import ASCENDING, IndexModel
 from pymongo.collection import Collection
 
 from models.agent import Agent
 from models.project import Project
 from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorCollection
+
+
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.PROJECTS,
+    version=1,
+    indexes=[IndexModel([("name", ASCENDING)], unique=True)],
+)
 
 
 class ProjectRepository:
@@ -25,7 +38,7 @@ class ProjectRepository:
             MongoEnum.Database.AGENT_00
         ][MongoEnum.Collection.PROJECTS]
 
-        self.__collection.create_index("name", unique=True)
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.PROJECTS)
 
     def create(self, project: Project) -> bool:
         """
@@ -48,57 +61,104 @@ class ProjectRepository:
 
         return True
 
-    def get(self, project_id: str) -> Union[Project, None]:
+    def get(
+        self,
+        project_id: str,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> Union[Project, None]:
         """
         Get a project by ID
 
         Args:
             - project_id: Project ID
+            - hydration: Strategy to load the agents and nodes of the project
         """
         self.__context.logger.info(f"Getting project with ID: {project_id}...")
-        # Avoid circular imports
-        from repositories.agent import AgentRepository
 
-        project = self.__collection.find_one(
-            {"_id": ObjectId(project_id)},
-            projection={"agents": 0},
+        projects: List[Project] = self.get_all(
+            {"_id": ObjectId(project_id)}, hydration=hydration
         )
-        if not project:
+        if not projects:
             self.__context.logger.warning("Project not found")
             return None
 
-        agent_repository: AgentRepository = AgentRepository(self.__context)
-        agents: List[Agent] = agent_repository.get_all({"project_id": project_id})
-        project["agents"] = agents
+        return projects[0]
+
+    @staticmethod
+    def query_shapes(seed: SimpleNamespace) -> List[Dict]:
+        """
+        Query shapes issued against the projects collection, used to check
+        that they are served by an index
 
-        return Project(**project)
+        Listing every project is a full scan by nature and is not included.
 
-    def get_all(self) -> Union[List[Project], None]:
+        Args:
+            - seed: Identifiers of seeded documents (project_id, agent_id, node_id)
+        """
+        # Avoid circular imports
+        from repositories.agent import AgentRepository
+
+        return [
+            {"filter": {"_id": ObjectId(seed.project_id)}},
+            {
+                "pipeline": [
+                    {"$match": {"_id": ObjectId(seed.project_id)}},
+                    AgentRepository.lookup_stage(),
+                ]
+            },
+        ]
+
+    def get_all(
+        self,
+        query: Union[Dict, None] = None,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> List[Project]:
         """
         Get all projects
 
         Args:
             - query: Query to filter projects
+            - hydration: Strategy to load the agents and nodes of the projects.
+              LOOKUP issues a single aggregation, BATCH issues one query per
+              level (projects, agents and nodes)
         """
         self.__context.logger.info("Getting all projects...")
         # Avoid circular imports
         from repositories.agent import AgentRepository
+        from repositories.node import NodeRepository
+
+        query = query or {}
+        if hydration == MongoEnum.Hydration.LOOKUP:
+            raw_projects = list(
+                self.__collection.aggregate(
+                    [{"$match": query}, AgentRepository.lookup_stage()]
+                )
+            )
+            for project in raw_projects:
+                for agent in project["agents"]:
+                    agent["nodes"] = [
+                        NodeRepository.to_node(node) for node in agent["nodes"]
+                    ]
 
-        raw_projects = self.__collection.find()
+            return [Project(**project) for project in raw_projects]
+
+        raw_projects = list(self.__collection.find(query, projection={"agents": 0}))
         if not raw_projects:
             self.__context.logger.warning("Projects not found")
             return []
 
-        projects: List[Project] = []
         agent_repository: AgentRepository = AgentRepository(self.__context)
+        agents: Dict[str, List[Agent]] = defaultdict(list)
+        for agent in agent_repository.get_all(
+            {"project_id": {"$in": [str(project["_id"]) for project in raw_projects]}},
+            hydration=hydration,
+        ):
+            agents[agent.project_id].append(agent)
+
         for project in raw_projects:
-            agents: List[Agent] = agent_repository.get_all(
-                {"project_id": str(project["_id"])}
-            )
-            project["agents"] = agents
-            projects.append(Project(**project))
+            project["agents"] = agents.get(str(project["_id"]), [])
 
-        return projects
+        return [Project(**project) for project in raw_projects]
 
     def update(self, id: str, query: Dict) -> bool:
         """
@@ -136,3 +196,94 @@ class ProjectRepository:
         self.__context.logger.info("Project deleted")
 
         return True
+
+
+class AsyncProjectRepository:
+    """
+    Asynchronous repository for Project collection
+
+    Covers the read paths. Indexes are ensured by ProjectRepository or
+    `cli.py db migrate`.
+    """
+
+    def __init__(self, context: SimpleNamespace):
+        self.__context: SimpleNamespace = context
+
+        self.__collection: "AsyncIOMotorCollection" = (
+            self.__context.async_mongodb_client[MongoEnum.Database.AGENT_00][
+                MongoEnum.Collection.PROJECTS
+            ]
+        )
+
+    async def get(
+        self,
+        project_id: str,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> Union[Project, None]:
+        """
+        Get a project by ID
+
+        Args:
+            - project_id: Project ID
+            - hydration: Strategy to load the agents and nodes of the project
+        """
+        self.__context.logger.info(f"Getting project with ID: {project_id}...")
+
+        projects: List[Project] = await self.get_all(
+            {"_id": ObjectId(project_id)}, hydration=hydration
+        )
+        if not projects:
+            self.__context.logger.warning("Project not found")
+            return None
+
+        return projects[0]
+
+    async def get_all(
+        self,
+        query: Union[Dict, None] = None,
+        hydration: MongoEnum.Hydration = MongoEnum.Hydration.LOOKUP,
+    ) -> List[Project]:
+        """
+        Get all projects
+
+        Args:
+            - query: Query to filter projects
+            - hydration: Strategy to load the agents and nodes of the projects
+        """
+        self.__context.logger.info("Getting all projects...")
+        # Avoid circular imports
+        from repositories.agent import AgentRepository, AsyncAgentRepository
+        from repositories.node import NodeRepository
+
+        query = query or {}
+        if hydration == MongoEnum.Hydration.LOOKUP:
+            raw_projects = await self.__collection.aggregate(
+                [{"$match": query}, AgentRepository.lookup_stage()]
+            ).to_list(length=None)
+            for project in raw_projects:
+                for agent in project["agents"]:
+                    agent["nodes"] = [
+                        NodeRepository.to_node(node) for node in agent["nodes"]
+                    ]
+
+            return [Project(**project) for project in raw_projects]
+
+        raw_projects = await self.__collection.find(
+            query, projection={"agents": 0}
+        ).to_list(length=None)
+        if not raw_projects:
+            self.__context.logger.warning("Projects not found")
+            return []
+
+        agent_repository: AsyncAgentRepository = AsyncAgentRepository(self.__context)
+        agents: Dict[str, List[Agent]] = defaultdict(list)
+        for agent in await agent_repository.get_all(
+            {"project_id": {"$in": [str(project["_id"]) for project in raw_projects]}},
+            hydration=hydration,
+        ):
+            agents[agent.project_id].append(agent)
+
+        for project in raw_projects:
+            project["agents"] = agents.get(str(project["_id"]), [])
+
+        return [Project(**project) for project in raw_projects]
@@ -0,0 +1,128 @@
+"""
+Defines repository for Run collection
+"""
+
+from datetime import timedelta
+from threading import Lock
+from types import SimpleNamespace
+from typing import Dict, List, Union
+import json
+import os
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collection import Collection
+
+from models.run import Run
+from utils.bulk_writer import BulkWriter
+from utils.enum import Mongo as MongoEnum
+from utils.indexes import INDEX_REGISTRY, ensure_indexes
+
+
+INDEX_REGISTRY.register(
+    MongoEnum.Collection.RUNS,
+    version=1,
+    indexes=[
+        IndexModel([("agent_id", ASCENDING), ("started_at", DESCENDING)]),
+        IndexModel([("run_id", ASCENDING)]),
+        # Runs are removed by the server once their retention is over
+        IndexModel([("expires_at", ASCENDING)], expireAfterSeconds=0),
+    ],
+)
+
+_WRITER: Union[BulkWriter, None] = None
+_LOCK: Lock = Lock()
+
+
+def to_document(run: Run) -> Dict:
+    """
+    Converts a run to a document. Inputs and outputs are passed through JSON,
+    so state values that BSON cannot encode are stored as strings. Runs
+    expire after RUNS_RETENTION_DAYS (default: 30, 0 keeps them forever)
+
+    Args:
+        - run: Run data
+    """
+    document: Dict = run.model_dump(
+        by_alias=True, exclude={"id", "inputs", "output"}
+    )
+    document["inputs"] = json.loads(json.dumps(run.inputs, default=str))
+    document["output"] = json.loads(json.dumps(run.output, default=str))
+
+    retention: int = int(os.getenv("RUNS_RETENTION_DAYS", 30))
+    if retention:
+        document["expires_at"] = run.started_at + timedelta(days=retention)
+
+    return document
+
+
+class RunRepository:
+    """
+    Repository for Run collection
+
+    Runs are written in bulk by a process-wide BulkWriter, so recording a run
+    does not add a database round trip to it. Settings are read from the
+    environment:
+        - RUNS_FLUSH_SIZE: Runs per insert_many (default: 100)
+        - RUNS_FLUSH_INTERVAL_MS: Maximum delay before a run is written
+          (default: 1000)
+        - RUNS_MAX_QUEUE: Runs buffered before new ones are dropped
+          (default: 10000)
+    """
+
+    def __init__(self, context: SimpleNamespace):
+        self.__context: SimpleNamespace = context
+
+        self.__collection: Collection = self.__context.mongodb_client[
+            MongoEnum.Database.AGENT_00
+        ][MongoEnum.Collection.RUNS]
+
+        ensure_indexes(self.__context.mongodb_client, MongoEnum.Collection.RUNS)
+
+    @property
+    def writer(self) -> BulkWriter:
+        """
+        Process-wide writer of the collection
+        """
+        global _WRITER
+
+        if _WRITER is not None:
+            return _WRITER
+
+        with _LOCK:
+            if _WRITER is None:
+                _WRITER = BulkWriter(
+                    self.__collection,
+                    to_document,
+                    max_size=int(os.getenv("RUNS_FLUSH_SIZE", 100)),
+                    interval=int(os.getenv("RUNS_FLUSH_INTERVAL_MS", 1000)) / 1000,
+                    max_queue=int(os.getenv("RUNS_MAX_QUEUE", 10000)),
+                )
+
+        return _WRITER
+
+    def get_all(
+        self,
+        agent_id: str,
+        status: Union[Run.Status, None] = None,
+        limit: int = 20,
+    ) -> List[Run]:
+        """
+        Get the latest runs of an agent
+
+        Args:
+            - agent_id: Agent ID
+            - status (optional): Only runs with this status
+            - limit (optional): Maximum number of runs
+        """
+        self.__context.logger.info(f"Getting runs of agent with ID: {agent_id}...")
+
+        query: Dict = {"agent_id": agent_id}
+        if status:
+            query["status"] = status
+
+        return [
+            Run(**run)
+            for run in self.__collection.find(
+                query, sort=[("started_at", DESCENDING)], limit=limit
+            )
+        ]
@@ -0,0 +1,138 @@
+"""
+Defines a buffered writer for MongoDB collections
+
+Documents are queued by the caller and inserted by a background thread with
+insert_many, either when the buffer is full or when the flush interval
+elapses, so callers never wait on the database.
+"""
+
+from queue import Empty, Full, Queue
+from threading import Thread
+from time import monotonic
+from typing import Any, Callable, Dict, List
+import atexit
+
+from pymongo.collection import Collection
+from pymongo.errors import PyMongoError
+
+from utils.logger import LOGGER
+
+
+class BulkWriter:
+    """
+    Buffers documents and inserts them in bulk from a background thread
+
+    Attributes:
+        - max_size: Documents per insert_many
+        - interval: Seconds to wait before flushing a partial buffer
+        - written: Number of documents inserted
+        - dropped: Number of documents dropped because the queue was full
+        - failed: Number of documents whose insert failed
+    """
+
+    __CLOSE: object = object()
+
+    def __init__(
+        self,
+        collection: Collection,
+        serialize: Callable[[Any], Dict],
+        max_size: int = 100,
+        interval: float = 1.0,
+        max_queue: int = 10000,
+    ) -> None:
+        self.max_size: int = max_size
+        self.interval: float = interval
+        self.written: int = 0
+        self.dropped: int = 0
+        self.failed: int = 0
+        self.__collection: Collection = collection
+        self.__serialize: Callable[[Any], Dict] = serialize
+        self.__queue: Queue = Queue(maxsize=max_queue)
+        self.__thread: Thread = Thread(
+            target=self.__run, name=f"bulk-writer-{collection.name}", daemon=True
+        )
+        self.__thread.start()
+        atexit.register(self.close)
+
+    def write(self, item: Any) -> None:
+        """
+        Queues an item. It is serialized on the writer thread
+
+        Args:
+            - item: Item to insert
+        """
+        try:
+            self.__queue.put_nowait(item)
+        except Full:
+            self.dropped += 1
+            LOGGER.warning(f"Dropping document for {self.__collection.name}")
+
+    def close(self, timeout: float = 10.0) -> None:
+        """
+        Flushes the queued documents and stops the writer thread
+
+        Args:
+            - timeout: Seconds to wait for the flush
+        """
+        if not self.__thread.is_alive():
+            return
+
+        self.__queue.put(self.__CLOSE)
+        self.__thread.join(timeout)
+
+    def __run(self) -> None:
+        """
+        Collects queued documents and flushes them, until closed
+        """
+        closed: bool = False
+        while not closed:
+            item: Any = self.__queue.get()
+            if item is self.__CLOSE:
+                break
+
+            buffer: List[Any] = [item]
+            deadline: float = monotonic() + self.interval
+            while len(buffer) < self.max_size:
+                timeout: float = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    item = self.__queue.get(timeout=timeout)
+                except Empty:
+                    break
+                if item is self.__CLOSE:
+                    closed = True
+                    break
+                buffer.append(item)
+
+            self.__flush(buffer)
+
+    def __flush(self, buffer: List[Any]) -> None:
+        """
+        Inserts a buffer of items
+
+        Args:
+            - buffer: Items to insert
+        """
+        try:
+            documents: List[Dict] = [self.__serialize(item) for item in buffer]
+            self.__collection.insert_many(documents, ordered=False)
+            self.written += len(documents)
+        except (PyMongoError, TypeError, ValueError) as error:
+            self.failed += len(buffer)
+            LOGGER.error(
+                f"Failed to write {len(buffer)} documents to "
+                f"{self.__collection.name}: {error}"
+            )
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Writer counters
+        """
+        return {
+            "queued": self.__queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "failed": self.failed,
+        }
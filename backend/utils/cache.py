@@ -0,0 +1,99 @@
+"""
+Defines in-memory cache utilities
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, Hashable, Union
+
+
+class LRUCache:
+    """
+    Thread-safe, size-bounded LRU cache with hit/miss/eviction counters
+
+    Attributes:
+        - maxsize: Maximum number of entries
+        - hits: Number of lookups that found an entry
+        - misses: Number of lookups that did not find an entry
+        - evictions: Number of entries removed to make room for new ones
+    """
+
+    def __init__(self, maxsize: int = 128) -> None:
+        self.maxsize: int = maxsize
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+        self.__entries: OrderedDict = OrderedDict()
+        self.__lock: Lock = Lock()
+
+    def __len__(self) -> int:
+        return len(self.__entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self.__entries
+
+    def get(self, key: Hashable, default: Any = None) -> Union[Any, None]:
+        """
+        Gets an entry and marks it as most recently used
+
+        Args:
+            - key: Entry key
+            - default: Value returned when the entry is missing
+        """
+        with self.__lock:
+            if key not in self.__entries:
+                self.misses += 1
+                return default
+
+            self.hits += 1
+            self.__entries.move_to_end(key)
+
+            return self.__entries[key]
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """
+        Adds or replaces an entry, evicting the least recently used one when
+        the cache is full
+
+        Args:
+            - key: Entry key
+            - value: Entry value
+        """
+        with self.__lock:
+            self.__entries[key] = value
+            self.__entries.move_to_end(key)
+            while len(self.__entries) > self.maxsize:
+                self.__entries.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable, default: Any = None) -> Union[Any, None]:
+        """
+        Removes an entry
+
+        Args:
+            - key: Entry key
+            - default: Value returned when the entry is missing
+        """
+        with self.__lock:
+            return self.__entries.pop(key, default)
+
+    def clear(self) -> None:
+        """
+        Removes every entry and resets the counters
+        """
+        with self.__lock:
+            self.__entries.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Cache counters
+        """
+        return {
+            "size": len(self.__entries),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
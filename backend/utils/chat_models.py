@@ -0,0 +1,73 @@
+"""
+Defines a pool of chat model clients shared across nodes, runs and threads
+
+Chat model clients hold the provider SDK client and its HTTP connection pool,
+so reusing them keeps connections alive between calls instead of paying for
+client construction and a new TLS handshake on every node execution.
+"""
+
+from hashlib import sha256
+from threading import Lock
+from typing import TYPE_CHECKING, Hashable, Tuple, Union
+import os
+
+from constants.model_providers import LLMModel, model_provider
+from utils.cache import LRUCache
+from utils.logger import LOGGER
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+CHAT_MODELS: LRUCache = LRUCache(int(os.getenv("CHAT_MODEL_POOL_SIZE", 32)))
+_LOCK: Lock = Lock()
+
+
+def get_chat_model(model: str, temperature: float) -> "BaseChatModel":
+    """
+    Returns the pooled chat model client for a model and its settings
+
+    Clients are keyed by (provider, model name, temperature, api key).
+
+    Args:
+        - model: Name of the model. See LLMModel enum.
+        - temperature: Temperature for the model
+    """
+    model_config: dict = model_provider.get(model)
+    api_key: Union[str, None] = model_config.get("api_key")
+    key: Tuple[Hashable, ...] = (
+        model_config.get("name"),
+        model,
+        temperature,
+        sha256(api_key.encode()).hexdigest() if api_key else None,
+    )
+
+    chat_model: Union["BaseChatModel", None] = CHAT_MODELS.get(key)
+    if chat_model is not None:
+        return chat_model
+
+    with _LOCK:
+        chat_model = CHAT_MODELS.get(key)
+        if chat_model is None:
+            LOGGER.info(f"Creating chat model client for {model}...")
+            # LangChain is imported on first use, so commands that do not run
+            # agents do not pay for it
+            if model == LLMModel.LOCAL_FAKE:
+                from utils.fake_chat_model import LocalFakeChatModel
+
+                chat_model = LocalFakeChatModel(**model_config.get("settings", {}))
+            else:
+                from langchain.chat_models import init_chat_model
+
+                chat_model = init_chat_model(
+                    model=model,
+                    model_provider=model_config.get("name"),
+                    temperature=temperature,
+                    api_key=api_key,
+                    # Retries go through the rate limiter, so they wait for
+                    # capacity and honor Retry-After. It retries transient
+                    # errors too, see utils.rate_limiter.backoff
+                    max_retries=0,
+                )
+            CHAT_MODELS.put(key, chat_model)
+
+    return chat_model
@@ -5,7 +5,7 @@ Defines context utility
 from types import SimpleNamespace
 
 from utils.logger import LOGGER
-from utils.mongodb_client import get_mongodb_client
+from utils.mongodb_client import get_async_mongodb_client, get_mongodb_client
 
 
 async def inject_context() -> SimpleNamespace:
@@ -15,4 +15,5 @@ async def inject_context() -> SimpleNamespace:
     context: SimpleNamespace = SimpleNamespace()
     context.logger = LOGGER
     context.mongodb_client = get_mongodb_client()
+    context.async_mongodb_client = get_async_mongodb_client()
     return context
@@ -5,6 +5,11 @@ Defines enum for the app
 from enum import Enum
 from json import loads
 from typing import Any
+import os
+
+from dotenv import load_dotenv
+
+load_dotenv()
 
 
 class Mongo:
@@ -15,9 +20,12 @@ class Mongo:
     class Database(str, Enum):
         """
         Enum for Databases
+
+        Every collection lives in the database set by MONGODB_DATABASE
+        (default: agent_00), so $lookup stages can join them
         """
 
-        AGENT_00 = "agent_00"
+        AGENT_00 = os.getenv("MONGODB_DATABASE", "agent_00")
 
     class Collection(str, Enum):
         """
@@ -27,6 +35,23 @@ class Mongo:
         PROJECTS = "projects"
         AGENTS = "agents"
         NODES = "nodes"
+        MIGRATIONS = "migrations"
+        CHECKPOINTS = "checkpoints"
+        CHECKPOINT_WRITES = "checkpoint_writes"
+        LLM_CACHE = "llm_cache"
+        RUNS = "runs"
+        JOBS = "jobs"
+
+    class Hydration(str, Enum):
+        """
+        Enum for strategies to load nested documents
+
+        - LOOKUP: Single aggregation using $lookup stages
+        - BATCH: One query per level using $in
+        """
+
+        LOOKUP = "lookup"
+        BATCH = "batch"
 
 
 class CLI:
@@ -0,0 +1,198 @@
+"""
+Defines the chat model of the local-fake provider
+
+It answers without network calls or API keys, after a simulated latency, and
+can inject errors and rate limit (429) responses, so the rate limiter,
+batcher, cache and concurrency settings can be load tested offline.
+"""
+
+from enum import Enum
+from random import Random
+from types import SimpleNamespace
+from typing import Any, List, Optional
+import asyncio
+import time
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.pydantic_v1 import PrivateAttr
+
+from utils.rate_limiter import estimate_tokens
+
+# Words used to pad responses up to output_tokens
+FILLER: List[str] = ["lorem", "ipsum", "dolor", "sit", "amet"]
+
+
+class LatencyDistribution(str, Enum):
+    """
+    Enum for simulated latency distributions
+
+    - fixed: Always latency_ms
+    - uniform: Between latency_ms - latency_jitter_ms and latency_ms + latency_jitter_ms
+    - normal: Mean latency_ms, standard deviation latency_jitter_ms
+    - exponential: Mean latency_ms, with a long tail
+    """
+
+    fixed = "fixed"
+    uniform = "uniform"
+    normal = "normal"
+    exponential = "exponential"
+
+
+class InjectedError(Exception):
+    """
+    Error injected by the local-fake provider
+    """
+
+
+class InjectedRateLimitError(InjectedError):
+    """
+    Rate limit error injected by the local-fake provider. It looks like a
+    provider 429 response, with a Retry-After header
+    """
+
+    status_code: int = 429
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Rate limited, retry after {retry_after}s")
+        self.response: SimpleNamespace = SimpleNamespace(
+            status_code=self.status_code, headers={"retry-after": str(retry_after)}
+        )
+
+
+class LocalFakeChatModel(BaseChatModel):
+    """
+    Chat model that answers locally with a templated response
+
+    Responses only depend on the prompt, so they are deterministic and can be
+    cached. Latencies and injected errors are drawn from a random generator,
+    seeded with seed when set.
+
+    Attributes:
+        - response: Response template. {prompt} is replaced by the prompt
+        - latency_ms: Mean latency of a response
+        - latency_jitter_ms: Spread of the latency. See LatencyDistribution
+        - latency_distribution: See LatencyDistribution enum
+        - token_latency_ms: Latency added per output token
+        - output_tokens: Words per response. The template is padded or cut
+          to match. The rendered template is used as is if 0
+        - error_rate: Share of requests that fail after their latency
+        - rate_limit_rate: Share of requests that are rate limited at once
+        - retry_after: Seconds in the Retry-After header of rate limited ones
+        - seed: Seed of the random generator
+    """
+
+    response: str = "Response to: {prompt}"
+    latency_ms: float = 0.0
+    latency_jitter_ms: float = 0.0
+    latency_distribution: LatencyDistribution = LatencyDistribution.fixed
+    token_latency_ms: float = 0.0
+    output_tokens: int = 0
+    error_rate: float = 0.0
+    rate_limit_rate: float = 0.0
+    retry_after: float = 1.0
+    seed: Optional[int] = None
+
+    _random: Random = PrivateAttr()
+
+    def __init__(self, **kwargs: Any) -> None:
+        super().__init__(**kwargs)
+        self._random = Random(self.seed)
+
+    @property
+    def _llm_type(self) -> str:
+        return "local-fake"
+
+    def __respond(self, messages: List[BaseMessage]) -> ChatResult:
+        """
+        Renders the response to the last message
+
+        Args:
+            - messages: Messages of the request
+        """
+        prompt: str = str(messages[-1].content) if messages else ""
+        content: str = self.response.replace("{prompt}", prompt)
+        if self.output_tokens:
+            words: List[str] = content.split()
+            words += [
+                FILLER[index % len(FILLER)]
+                for index in range(self.output_tokens - len(words))
+            ]
+            content = " ".join(words[: self.output_tokens])
+
+        input_tokens: int = sum(
+            estimate_tokens(message.content) for message in messages
+        )
+        output_tokens: int = self.output_tokens or estimate_tokens(content)
+        message: AIMessage = AIMessage(
+            content=content,
+            usage_metadata={
+                "input_tokens": input_tokens,
+                "output_tokens": output_tokens,
+                "total_tokens": input_tokens + output_tokens,
+            },
+        )
+
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def __latency(self) -> float:
+        """
+        Draws the latency of a response, in seconds
+        """
+        mean: float = self.latency_ms
+        jitter: float = self.latency_jitter_ms
+        if self.latency_distribution == LatencyDistribution.uniform:
+            latency: float = self._random.uniform(mean - jitter, mean + jitter)
+        elif self.latency_distribution == LatencyDistribution.normal:
+            latency = self._random.gauss(mean, jitter)
+        elif self.latency_distribution == LatencyDistribution.exponential:
+            latency = self._random.expovariate(1 / mean) if mean else 0.0
+        else:
+            latency = mean
+
+        return (max(latency, 0.0) + self.output_tokens * self.token_latency_ms) / 1000
+
+    def __outcome(self) -> float:
+        """
+        Draws the outcome of a request. Rate limited requests fail at once
+
+        Returns:
+            - Roll for error_rate, after rate_limit_rate has been applied
+
+        Raises:
+            - InjectedRateLimitError: If the request is rate limited
+        """
+        roll: float = self._random.random()
+        if roll < self.rate_limit_rate:
+            raise InjectedRateLimitError(self.retry_after)
+
+        return roll - self.rate_limit_rate
+
+    def _generate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        roll: float = self.__outcome()
+        time.sleep(self.__latency())
+        if roll < self.error_rate:
+            raise InjectedError("Injected provider error")
+
+        return self.__respond(messages)
+
+    async def _agenerate(
+        self,
+        messages: List[BaseMessage],
+        stop: Optional[List[str]] = None,
+        run_manager: Optional[Any] = None,
+        **kwargs: Any,
+    ) -> ChatResult:
+        roll: float = self.__outcome()
+        await asyncio.sleep(self.__latency())
+        if roll < self.error_rate:
+            raise InjectedError("Injected provider error")
+
+        return self.__respond(messages)
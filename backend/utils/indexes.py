@@ -0,0 +1,180 @@
+"""
+Defines the index registry for MongoDB collections
+
+Repositories declare their indexes once at import time together with a
+version. Indexes are ensured at most once per process, and only when the
+declared version is newer than the one recorded in the migrations collection,
+so repository constructors do not issue createIndexes commands.
+"""
+
+from threading import Lock
+from typing import Any, Dict, List, Set, Tuple
+import os
+
+from pymongo import IndexModel, MongoClient
+from pymongo.database import Database
+
+from utils.enum import Mongo as MongoEnum
+from utils.logger import LOGGER
+
+
+class IndexRegistry:
+    """
+    Registry of indexes per collection
+    """
+
+    def __init__(self) -> None:
+        self.__indexes: Dict[MongoEnum.Collection, Tuple[int, List[IndexModel]]] = {}
+        self.__ensured: Set[MongoEnum.Collection] = set()
+        self.__lock: Lock = Lock()
+
+    @property
+    def collections(self) -> List[MongoEnum.Collection]:
+        """
+        Collections with declared indexes
+        """
+        return list(self.__indexes)
+
+    def indexes(self, collection: MongoEnum.Collection) -> List[IndexModel]:
+        """
+        Declared indexes of a collection
+
+        Args:
+            - collection: Collection name
+        """
+        return self.__indexes[collection][1]
+
+    def register(
+        self,
+        collection: MongoEnum.Collection,
+        version: int,
+        indexes: List[IndexModel],
+    ) -> None:
+        """
+        Declares the indexes of a collection
+
+        Args:
+            - collection: Collection name
+            - version: Version of the index set. Bump it to roll out changes
+            - indexes: Index definitions
+        """
+        self.__indexes[collection] = (version, indexes)
+
+    def ensure(
+        self,
+        client: MongoClient,
+        collection: MongoEnum.Collection,
+        force: bool = False,
+        prune: bool = False,
+    ) -> bool:
+        """
+        Ensures the indexes of a collection, once per process
+
+        Args:
+            - client: MongoDB client
+            - collection: Collection name
+            - force: Creates the indexes even if the version is up to date
+            - prune: Drops indexes that are no longer declared
+
+        Returns:
+            - Whether indexes were created
+        """
+        if collection in self.__ensured and not force:
+            return False
+
+        with self.__lock:
+            if collection in self.__ensured and not force:
+                return False
+
+            version, indexes = self.__indexes[collection]
+            database: Database = client[MongoEnum.Database.AGENT_00]
+            migrations = database[MongoEnum.Collection.MIGRATIONS]
+            applied: Dict = migrations.find_one({"_id": collection.value}) or {}
+
+            created: bool = False
+            if force or applied.get("version", 0) < version:
+                LOGGER.info(f"Creating indexes v{version} for {collection.value}...")
+                database[collection].create_indexes(indexes)
+                migrations.update_one(
+                    {"_id": collection.value},
+                    {"$set": {"version": version}},
+                    upsert=True,
+                )
+                created = True
+
+            if prune:
+                declared: Set[str] = {index.document["name"] for index in indexes}
+                for name in database[collection].index_information():
+                    if name != "_id_" and name not in declared:
+                        LOGGER.info(f"Dropping index {name} on {collection.value}")
+                        database[collection].drop_index(name)
+
+            self.__ensured.add(collection)
+
+        return created
+
+    def ensure_all(
+        self, client: MongoClient, force: bool = False, prune: bool = False
+    ) -> List[MongoEnum.Collection]:
+        """
+        Ensures the indexes of every registered collection
+
+        Args:
+            - client: MongoDB client
+            - force: Creates the indexes even if the versions are up to date
+            - prune: Drops indexes that are no longer declared
+
+        Returns:
+            - Collections whose indexes were created
+        """
+        return [
+            collection
+            for collection in self.collections
+            if self.ensure(client, collection, force=force, prune=prune)
+        ]
+
+
+INDEX_REGISTRY: IndexRegistry = IndexRegistry()
+
+
+def find_collection_scans(explain: Any) -> List[str]:
+    """
+    Finds the stages of an explain output that scan a whole collection
+
+    Args:
+        - explain: Output of a find or aggregate explain
+
+    Returns:
+        - Description of each collection scan found
+    """
+    scans: List[str] = []
+    if isinstance(explain, list):
+        for item in explain:
+            scans.extend(find_collection_scans(item))
+    elif isinstance(explain, dict):
+        if explain.get("stage") == "COLLSCAN":
+            scans.append(f"COLLSCAN on {explain.get('namespace', 'collection')}")
+        if explain.get("strategy") in ("NestedLoopJoin", "HashJoin"):
+            scans.append(f"{explain['strategy']} on {explain.get('foreignCollection')}")
+        if explain.get("collectionScans"):
+            scans.append(f"$lookup with {explain['collectionScans']} collection scans")
+        for value in explain.values():
+            scans.extend(find_collection_scans(value))
+
+    return scans
+
+
+def ensure_indexes(client: MongoClient, collection: MongoEnum.Collection) -> None:
+    """
+    Ensures the indexes of a collection unless disabled with
+    MONGODB_ENSURE_INDEXES=false, in which case `cli.py db migrate` is
+    expected to have been run
+
+    Args:
+        - client: MongoDB client
+        - collection: Collection name
+    """
+    if os.getenv("MONGODB_ENSURE_INDEXES", "true").lower() == "false":
+        return
+
+    INDEX_REGISTRY.ensure(client, collection)
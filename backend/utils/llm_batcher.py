@@ -0,0 +1,172 @@
+"""
+Defines the micro-batching layer for LLM requests
+
+Concurrent requests for the same model and settings are collected over a
+short window and sent together with the chat model's batch method, so
+high-throughput jobs amortize the per-request overhead. It is disabled
+unless LLM_BATCH_WINDOW_MS is set.
+"""
+
+from concurrent.futures import Future, ThreadPoolExecutor
+from queue import Empty, Queue
+from threading import Lock, Thread
+from time import monotonic
+from typing import TYPE_CHECKING, Any, Dict, List, Tuple, Union
+import os
+
+from utils.chat_models import get_chat_model
+from utils.logger import LOGGER
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+
+
+class LLMBatcher:
+    """
+    Collects requests for a chat model and dispatches them in batches
+
+    Attributes:
+        - window: Seconds to wait for more requests after the first one
+        - max_size: Maximum number of requests per batch
+        - batches: Number of batches dispatched
+        - requests: Number of requests dispatched
+    """
+
+    def __init__(
+        self,
+        llm: "BaseChatModel",
+        window: float,
+        max_size: int,
+        max_concurrency: int,
+    ) -> None:
+        self.window: float = window
+        self.max_size: int = max_size
+        self.batches: int = 0
+        self.requests: int = 0
+        self.__llm: "BaseChatModel" = llm
+        self.__queue: "Queue[Tuple[Any, Future]]" = Queue()
+        self.__executor: ThreadPoolExecutor = ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="llm-batch"
+        )
+        Thread(target=self.__collect, name="llm-batcher", daemon=True).start()
+
+    def submit(self, prompt: Any) -> Future:
+        """
+        Queues a request
+
+        Args:
+            - prompt: Prompt for the model
+
+        Returns:
+            - Future with the model response. Wrap it with asyncio.wrap_future
+              to await it
+        """
+        future: Future = Future()
+        self.__queue.put((prompt, future))
+
+        return future
+
+    def __collect(self) -> None:
+        """
+        Groups queued requests into batches, forever
+        """
+        while True:
+            batch: List[Tuple[Any, Future]] = [self.__queue.get()]
+            deadline: float = monotonic() + self.window
+            while len(batch) < self.max_size:
+                timeout: float = deadline - monotonic()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(self.__queue.get(timeout=timeout))
+                except Empty:
+                    break
+
+            self.__executor.submit(self.__dispatch, batch)
+
+    def __dispatch(self, batch: List[Tuple[Any, Future]]) -> None:
+        """
+        Sends a batch and hands each response to its request
+
+        Args:
+            - batch: Requests of the batch
+        """
+        self.batches += 1
+        self.requests += len(batch)
+        try:
+            responses: List[Any] = self.__llm.batch(
+                [prompt for prompt, _ in batch], return_exceptions=True
+            )
+        except Exception as error:
+            responses = [error] * len(batch)
+
+        for (_, future), response in zip(batch, responses):
+            if isinstance(response, Exception):
+                future.set_exception(response)
+            else:
+                future.set_result(response)
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Batch counters
+        """
+        return {
+            "batches": self.batches,
+            "requests": self.requests,
+            "mean_batch_size": (
+                round(self.requests / self.batches, 3) if self.batches else 0.0
+            ),
+        }
+
+
+LLM_BATCHERS: Dict[Tuple[str, float], LLMBatcher] = {}
+_LOCK: Lock = Lock()
+
+
+def get_llm_batcher(model: str, temperature: float) -> Union[LLMBatcher, None]:
+    """
+    Returns the process-wide batcher of a model and its settings
+
+    Settings are read from the environment:
+        - LLM_BATCH_WINDOW_MS: Collection window. Batching is disabled if 0
+          (default: 0)
+        - LLM_BATCH_MAX_SIZE: Maximum requests per batch (default: 16)
+        - LLM_BATCH_MAX_CONCURRENCY: Batches in flight (default: 4)
+
+    Args:
+        - model: Name of the model. See LLMModel enum.
+        - temperature: Temperature for the model
+
+    Returns:
+        - The batcher, or None if batching is disabled
+    """
+    window: float = float(os.getenv("LLM_BATCH_WINDOW_MS", 0)) / 1000
+    if not window:
+        return None
+
+    key: Tuple[str, float] = (model, temperature)
+    if key in LLM_BATCHERS:
+        return LLM_BATCHERS[key]
+
+    with _LOCK:
+        if key not in LLM_BATCHERS:
+            LOGGER.info(f"Batching {model} requests every {window}s...")
+            LLM_BATCHERS[key] = LLMBatcher(
+                get_chat_model(model, temperature),
+                window=window,
+                max_size=int(os.getenv("LLM_BATCH_MAX_SIZE", 16)),
+                max_concurrency=int(os.getenv("LLM_BATCH_MAX_CONCURRENCY", 4)),
+            )
+
+    return LLM_BATCHERS[key]
+
+
+def batcher_stats() -> Dict:
+    """
+    Counters of every batcher in use
+    """
+    return {
+        f"{model}/{temperature}": batcher.stats
+        for (model, temperature), batcher in LLM_BATCHERS.items()
+    }
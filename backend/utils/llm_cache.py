@@ -0,0 +1,210 @@
+"""
+Defines the content-addressed cache of LLM responses
+
+Responses are keyed by (model, temperature, rendered prompt hash), expire
+after a per-node TTL and are evicted least recently used first once the
+store is full. Stores are shared by the whole process.
+"""
+
+from enum import Enum
+from hashlib import sha256
+from threading import Lock
+from time import time
+from types import SimpleNamespace
+from typing import Dict, Union
+import json
+import os
+import sqlite3
+
+from utils.logger import LOGGER
+
+
+class LLMCacheBackend(str, Enum):
+    """
+    Enum for LLM cache backends
+    """
+
+    sqlite = "sqlite"
+    mongo = "mongo"
+
+
+def cache_key(model: str, temperature: float, prompt: str) -> str:
+    """
+    Builds the cache key of a LLM request
+
+    Args:
+        - model: Name of the model
+        - temperature: Temperature for the model
+        - prompt: Rendered prompt
+    """
+    return sha256(
+        json.dumps([model, temperature, prompt], default=str).encode()
+    ).hexdigest()
+
+
+class BaseLLMCache:
+    """
+    Base LLM cache with hit/miss counters
+    """
+
+    def __init__(self) -> None:
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def lookup(self, key: str) -> Union[str, None]:
+        """
+        Gets a cached response and counts the hit or miss
+
+        Args:
+            - key: Cache key
+        """
+        value: Union[str, None] = self.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        return value
+
+    def get(self, key: str) -> Union[str, None]:
+        """
+        Gets a cached response, if present and not expired
+        """
+        raise NotImplementedError
+
+    def put(self, key: str, value: str, ttl: Union[int, None] = None) -> None:
+        """
+        Stores a response
+        """
+        raise NotImplementedError
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Cache counters
+        """
+        lookups: int = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+class SQLiteLLMCache(BaseLLMCache):
+    """
+    LLM cache stored in a local SQLite file
+    """
+
+    def __init__(self, path: str, max_entries: int) -> None:
+        super().__init__()
+        self.__max_entries: int = max_entries
+        self.__lock: Lock = Lock()
+        self.__connection: sqlite3.Connection = sqlite3.connect(
+            path, check_same_thread=False
+        )
+        with self.__lock, self.__connection:
+            self.__connection.execute("PRAGMA journal_mode=WAL")
+            self.__connection.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                "expires_at REAL, accessed_at REAL NOT NULL)"
+            )
+            self.__connection.execute(
+                "CREATE INDEX IF NOT EXISTS responses_accessed_at "
+                "ON responses (accessed_at)"
+            )
+
+    def get(self, key: str) -> Union[str, None]:
+        """
+        Gets a cached response, if present and not expired
+
+        Args:
+            - key: Cache key
+        """
+        now: float = time()
+        with self.__lock, self.__connection:
+            row = self.__connection.execute(
+                "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if not row:
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= now:
+                self.__connection.execute("DELETE FROM responses WHERE key = ?", (key,))
+                return None
+
+            self.__connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+
+        return value
+
+    def put(self, key: str, value: str, ttl: Union[int, None] = None) -> None:
+        """
+        Stores a response, evicting the least recently used ones when full
+
+        Args:
+            - key: Cache key
+            - value: Response content
+            - ttl: Seconds the response is valid for. No expiry by default
+        """
+        now: float = time()
+        with self.__lock, self.__connection:
+            self.__connection.execute(
+                "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl if ttl else None, now),
+            )
+            self.__connection.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY accessed_at LIMIT "
+                "MAX((SELECT COUNT(*) FROM responses) - ?, 0))",
+                (self.__max_entries,),
+            )
+
+
+LLM_CACHES: Dict[LLMCacheBackend, BaseLLMCache] = {}
+_LOCK: Lock = Lock()
+
+
+def get_llm_cache(backend: LLMCacheBackend) -> BaseLLMCache:
+    """
+    Returns the process-wide LLM cache of a backend
+
+    Settings are read from the environment:
+        - LLM_CACHE_PATH: SQLite file (default: .llm_cache.sqlite3)
+        - LLM_CACHE_MAX_ENTRIES: Maximum number of responses (default: 10000)
+
+    Args:
+        - backend: Cache backend
+    """
+    if backend in LLM_CACHES:
+        return LLM_CACHES[backend]
+
+    with _LOCK:
+        if backend not in LLM_CACHES:
+            LOGGER.info(f"Opening {backend.value} LLM cache...")
+            max_entries: int = int(os.getenv("LLM_CACHE_MAX_ENTRIES", 10000))
+            if backend == LLMCacheBackend.mongo:
+                # Avoid circular imports
+                from repositories.llm_cache import LLMCacheRepository
+                from utils.mongodb_client import get_mongodb_client
+
+                LLM_CACHES[backend] = LLMCacheRepository(
+                    SimpleNamespace(mongodb_client=get_mongodb_client(), logger=LOGGER),
+                    max_entries=max_entries,
+                )
+            else:
+                LLM_CACHES[backend] = SQLiteLLMCache(
+                    os.getenv("LLM_CACHE_PATH", ".llm_cache.sqlite3"), max_entries
+                )
+
+    return LLM_CACHES[backend]
+
+
+def cache_stats() -> Dict:
+    """
+    Counters of every open LLM cache
+    """
+    return {backend.value: cache.stats for backend, cache in LLM_CACHES.items()}
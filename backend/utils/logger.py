@@ -1,20 +1,164 @@
 """
 Defines logger functionality for the application.
+
+Records are put on an in-memory queue and written to stderr by a listener
+thread, so callers (e.g. node actions) never block on I/O. Records are
+formatted by the listener as JSON by default (LOG_FORMAT=text for plain
+lines), with any `extra` fields included. The level is read from LOG_LEVEL.
 """
+from copy import copy
 from functools import wraps
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+import atexit
+import json
 import logging
+import os
 from types import SimpleNamespace
-from typing import Callable, Dict
+from typing import Any, Callable, Dict
 import sys
 
+# Attributes every LogRecord has, anything else was passed with `extra`
+RECORD_ATTRIBUTES = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+def get_extras(record: logging.LogRecord) -> Dict:
+    """
+    Fields passed to a record with `extra`
+
+    Args:
+        - record: Log record
+    """
+    return {
+        key: value
+        for key, value in vars(record).items()
+        if key not in RECORD_ATTRIBUTES
+    }
+
+
+class JsonFormatter(logging.Formatter):
+    """
+    Formats records as one JSON object per line
+    """
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict = {
+            "time": self.formatTime(record),
+            "logger": record.name,
+            "level": record.levelname,
+            "message": record.getMessage(),
+        }
+        entry.update(get_extras(record))
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """
+    Formats records as plain lines, followed by their `extra` fields as
+    key=value pairs
+    """
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s - %(name)s - %(levelname)s - %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line: str = super().format(record)
+        extras: Dict = get_extras(record)
+        if not extras:
+            return line
+
+        fields: str = " ".join(
+            f"{key}={json.dumps(value, default=str)}" for key, value in extras.items()
+        )
+        head, newline, traceback = line.partition("\n")
+
+        return f"{head} {fields}{newline}{traceback}"
+
+
+class DeferredQueueHandler(QueueHandler):
+    """
+    Queue handler that leaves formatting to the listener thread
+
+    The default handler formats the record before enqueuing it, which would
+    keep the formatting cost on the caller. Containers passed with `extra`
+    are copied instead, so later changes by the caller (e.g. to the agent
+    state) do not show up in the formatted record.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        for key, value in get_extras(record).items():
+            if isinstance(value, (dict, list, set)):
+                setattr(record, key, copy(value))
+
+        return record
+
+
+def get_formatter() -> logging.Formatter:
+    """
+    Returns the formatter selected with LOG_FORMAT (json or text)
+    """
+    if os.getenv("LOG_FORMAT", "json").lower() == "text":
+        return TextFormatter()
+
+    return JsonFormatter()
+
+
+# stderr keeps stdout for command output, e.g. exported bundles
+_STREAM_HANDLER = logging.StreamHandler(sys.stderr)
+_STREAM_HANDLER.setFormatter(get_formatter())
+_QUEUE: SimpleQueue = SimpleQueue()
+LISTENER = QueueListener(_QUEUE, _STREAM_HANDLER, respect_handler_level=True)
+LISTENER.start()
+atexit.register(LISTENER.stop)
 
 logging.basicConfig(
-    level=logging.INFO,
-    stream=sys.stdout,
-    format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    handlers=[DeferredQueueHandler(_QUEUE)],
 )
 LOGGER = logging.getLogger(__name__)
-LOGGER.setLevel(logging.INFO)
+LOGGER.setLevel(os.getenv("LOG_LEVEL", "INFO").upper())
+
+
+def summarize(payload: Any) -> Any:
+    """
+    Summarizes a payload (e.g. the agent state) as its keys and sizes, so
+    logging it costs the same regardless of its size. A copy of the whole
+    payload is returned when debug logging is on, since records are
+    formatted later by the listener.
+
+    Args:
+        - payload: Payload to summarize
+    """
+    if LOGGER.isEnabledFor(logging.DEBUG):
+        return copy(payload)
+
+    if isinstance(payload, dict):
+        return {
+            key: len(value) if hasattr(value, "__len__") else type(value).__name__
+            for key, value in payload.items()
+        }
+
+    return len(payload) if hasattr(payload, "__len__") else type(payload).__name__
+
+
+def log_state(message: str, state: Any, level: int = logging.INFO, **fields) -> None:
+    """
+    Logs a message with the state summary as a structured field. Nothing is
+    computed when the level is disabled.
+
+    Args:
+        - message: Log message
+        - state: State of the agent
+        - level (optional): Log level
+        - fields (optional): Other structured fields
+    """
+    if not LOGGER.isEnabledFor(level):
+        return
+
+    LOGGER.log(level, message, extra={**fields, "state": summarize(state)})
 
 
 def logger(func: Callable) -> Callable:
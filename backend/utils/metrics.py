@@ -0,0 +1,41 @@
+"""
+Defines helpers to summarize performance measurements
+"""
+
+from math import ceil
+from typing import Dict, List
+
+
+def percentile(values: List[float], q: float) -> float:
+    """
+    Nearest-rank percentile
+
+    Args:
+        - values: Measurements
+        - q: Percentile between 0 and 100
+    """
+    if not values:
+        return 0.0
+
+    ordered: List[float] = sorted(values)
+    rank: int = max(ceil(q / 100 * len(ordered)), 1)
+
+    return ordered[rank - 1]
+
+
+def summarize_latencies(latencies: List[float], elapsed: float) -> Dict:
+    """
+    Summarizes latencies of a set of operations
+
+    Args:
+        - latencies: Latency of each operation in seconds
+        - elapsed: Wall time of the whole set in seconds
+    """
+    return {
+        "count": len(latencies),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_per_s": round(len(latencies) / elapsed, 3) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 3),
+    }
@@ -1,23 +1,126 @@
 """
 Creates a MongoDB client and database connection.
+
+A single MongoClient is shared by the whole process. It is created lazily on
+first use, warmed up with a ping and closed at interpreter exit, so commands,
+handlers and workers reuse the same connection pool. The same applies to the
+asynchronous (motor) client used by async repositories.
 """
 
 from functools import wraps
+from threading import Lock
 from types import SimpleNamespace
-from typing import Callable, Dict
+from typing import TYPE_CHECKING, Callable, Dict, Union
+import atexit
 import os
 
 from pymongo import MongoClient
-from rich import print
 
 from utils.logger import LOGGER
+from utils.tracing import MongoCommandTracer
+
+if TYPE_CHECKING:
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+_CLIENT: Union[MongoClient, None] = None
+_ASYNC_CLIENT: Union["AsyncIOMotorClient", None] = None
+_LOCK: Lock = Lock()
+
+
+def get_client_settings() -> Dict:
+    """
+    Returns the MongoClient pool and timeout settings
+
+    Settings are read from the environment:
+        - MONGODB_MAX_POOL_SIZE (default: 100)
+        - MONGODB_MIN_POOL_SIZE (default: 0)
+        - MONGODB_MAX_IDLE_TIME_MS (default: no limit)
+        - MONGODB_CONNECT_TIMEOUT_MS (default: 20000)
+        - MONGODB_SERVER_SELECTION_TIMEOUT_MS (default: 30000)
+        - MONGODB_SOCKET_TIMEOUT_MS (default: no limit)
+
+    A command listener is attached so MongoDB commands show up in traces.
+    """
+    settings: Dict = {
+        "maxPoolSize": int(os.getenv("MONGODB_MAX_POOL_SIZE", 100)),
+        "minPoolSize": int(os.getenv("MONGODB_MIN_POOL_SIZE", 0)),
+        "connectTimeoutMS": int(os.getenv("MONGODB_CONNECT_TIMEOUT_MS", 20000)),
+        "serverSelectionTimeoutMS": int(
+            os.getenv("MONGODB_SERVER_SELECTION_TIMEOUT_MS", 30000)
+        ),
+        "event_listeners": [MongoCommandTracer()],
+    }
+    if os.getenv("MONGODB_MAX_IDLE_TIME_MS"):
+        settings["maxIdleTimeMS"] = int(os.getenv("MONGODB_MAX_IDLE_TIME_MS"))
+    if os.getenv("MONGODB_SOCKET_TIMEOUT_MS"):
+        settings["socketTimeoutMS"] = int(os.getenv("MONGODB_SOCKET_TIMEOUT_MS"))
+
+    return settings
 
 
 def get_mongodb_client() -> MongoClient:
     """
-    Returns a MongoDB client
+    Returns the process-wide MongoDB client
+
+    The client is created on first call and pinged so the first operation does
+    not pay for server discovery.
     """
-    return MongoClient(os.getenv("MONGODB_CLIENT_URI"))
+    global _CLIENT
+
+    if _CLIENT is not None:
+        return _CLIENT
+
+    with _LOCK:
+        if _CLIENT is None:
+            LOGGER.info("Connecting to MongoDB...")
+            client: MongoClient = MongoClient(
+                os.getenv("MONGODB_CLIENT_URI"), **get_client_settings()
+            )
+            client.admin.command("ping")
+            _CLIENT = client
+            LOGGER.info("MongoDB is connected")
+
+    return _CLIENT
+
+
+def get_async_mongodb_client() -> "AsyncIOMotorClient":
+    """
+    Returns the process-wide asynchronous MongoDB client
+
+    The client binds to the event loop where it is first used. Motor is
+    imported on first call, so synchronous commands do not pay for it.
+    """
+    global _ASYNC_CLIENT
+
+    if _ASYNC_CLIENT is not None:
+        return _ASYNC_CLIENT
+
+    with _LOCK:
+        if _ASYNC_CLIENT is None:
+            from motor.motor_asyncio import AsyncIOMotorClient
+
+            _ASYNC_CLIENT = AsyncIOMotorClient(
+                os.getenv("MONGODB_CLIENT_URI"), **get_client_settings()
+            )
+
+    return _ASYNC_CLIENT
+
+
+@atexit.register
+def close_mongodb_client() -> None:
+    """
+    Closes the process-wide MongoDB clients, if any
+    """
+    global _CLIENT, _ASYNC_CLIENT
+
+    with _LOCK:
+        if _CLIENT is not None:
+            LOGGER.info("Closing MongoDB connection")
+            _CLIENT.close()
+            _CLIENT = None
+        if _ASYNC_CLIENT is not None:
+            _ASYNC_CLIENT.close()
+            _ASYNC_CLIENT = None
 
 
 def mongodb_client(func: Callable) -> Callable:
@@ -33,15 +136,9 @@ def mongodb_client(func: Callable) -> Callable:
         Wrapper for func
         """
         context.logger.info("Injecting MongoDB client...")
-        context.mongodb_client = MongoClient(os.getenv("MONGODB_CLIENT_URI"))
-        context.logger.info(f"MongoDB is connected")
-
-        response = func(event, context)
+        context.mongodb_client = get_mongodb_client()
 
-        context.logger.info("Closing MongoDB connection...")
-        context.mongodb_client.close()
-
-        return response
+        return func(event, context)
 
     return wrapper
 
@@ -49,16 +146,16 @@ def mongodb_client(func: Callable) -> Callable:
 class Mongo:
     """
     Context manager to handle mongo operations
+
+    Yields the process-wide client. The connection is kept open on exit so
+    it can be reused by later operations.
     """
 
     def __init__(self) -> None:
-        LOGGER.info("Connection to MongoDB")
         self.__client: MongoClient = get_mongodb_client()
 
     def __enter__(self):
         return self.__client
 
     def __exit__(self, exc_type, exc_val, exc_tb):
-        LOGGER.info("Closing MongoDB connection")
-        self.__client.close()
-
+        pass
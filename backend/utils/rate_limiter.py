@@ -0,0 +1,389 @@
+"""
+Defines the rate limiter for LLM providers
+
+Every (provider, model) pair gets a limiter with a requests-per-minute and a
+tokens-per-minute bucket. Callers reserve capacity in arrival order and wait
+until their reservation is due, so concurrent runs are served first come,
+first served and the provider quota is used without exceeding it.
+"""
+
+from collections import deque
+from random import uniform
+from threading import Lock
+from time import monotonic, sleep
+from typing import Any, Awaitable, Callable, Deque, Dict, Hashable, Tuple, Union
+import asyncio
+import os
+
+from constants.model_providers import model_provider
+from utils.logger import LOGGER
+from utils.metrics import percentile
+
+
+class TokenBucket:
+    """
+    Token bucket that allows reservations beyond its balance
+
+    A reservation that overdraws the bucket returns how long the caller has to
+    wait for the balance to be refilled.
+    """
+
+    def __init__(self, per_minute: int) -> None:
+        self.capacity: float = float(per_minute)
+        self.rate: float = per_minute / 60
+        self.__balance: float = float(per_minute)
+        self.__updated_at: float = monotonic()
+
+    def reserve(self, amount: float, now: float) -> float:
+        """
+        Takes an amount from the bucket
+
+        Args:
+            - amount: Amount to take
+            - now: Current monotonic time
+
+        Returns:
+            - Seconds to wait until the amount is available
+        """
+        self.__balance = min(
+            self.capacity, self.__balance + (now - self.__updated_at) * self.rate
+        )
+        self.__updated_at = now
+        self.__balance -= amount
+
+        return max(-self.__balance / self.rate, 0.0)
+
+    def refund(self, amount: float) -> None:
+        """
+        Gives back an amount, e.g. when fewer tokens than reserved were used
+
+        Args:
+            - amount: Amount to give back. Negative to take more
+        """
+        self.__balance = min(self.capacity, self.__balance + amount)
+
+
+def estimate_tokens(prompt: Any) -> int:
+    """
+    Rough token count of a prompt, about 4 characters per token
+
+    Args:
+        - prompt: Prompt sent to the model
+    """
+    return max(len(str(prompt)) // 4, 1)
+
+
+def retry_after(error: Exception) -> Union[float, None]:
+    """
+    Seconds to wait after a rate limited request
+
+    Args:
+        - error: Error raised by the provider
+
+    Returns:
+        - Seconds from the Retry-After header (1 if missing), or None if the
+          error is not a rate limit error
+    """
+    response: Any = getattr(error, "response", None)
+    status_code: Any = getattr(error, "status_code", None) or getattr(
+        response, "status_code", None
+    )
+    if status_code != 429:
+        return None
+
+    headers: Dict = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 1))
+    except (TypeError, ValueError):
+        return 1.0
+
+
+# Status codes of provider errors worth retrying: timeouts, conflicts and
+# server errors
+RETRYABLE_STATUS_CODES: Tuple[int, ...] = (408, 409, 500, 502, 503, 504)
+
+# Errors raised by provider clients when the connection fails or times out.
+# Matched by name so no client has to be imported
+RETRYABLE_ERRORS: Tuple[str, ...] = (
+    "APIConnectionError",
+    "APITimeoutError",
+    "ConnectError",
+    "ReadTimeout",
+    "RemoteProtocolError",
+    "TimeoutException",
+)
+
+
+def backoff(error: Exception, attempt: int) -> Union[float, None]:
+    """
+    Seconds to wait after a transient provider error. The delay doubles with
+    every attempt, from LLM_RETRY_DELAY seconds (default: 0.5) up to
+    LLM_RETRY_MAX_DELAY (default: 8), with jitter so concurrent requests do
+    not retry at once
+
+    Args:
+        - error: Error raised by the provider
+        - attempt: Attempt that failed, from 0
+
+    Returns:
+        - Seconds to wait, or None if the error is not transient
+    """
+    response: Any = getattr(error, "response", None)
+    status_code: Any = getattr(error, "status_code", None) or getattr(
+        response, "status_code", None
+    )
+    transient: bool = (
+        status_code in RETRYABLE_STATUS_CODES
+        or isinstance(error, (ConnectionError, TimeoutError))
+        or any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__)
+    )
+    if not transient:
+        return None
+
+    delay: float = min(
+        float(os.getenv("LLM_RETRY_DELAY", 0.5)) * 2**attempt,
+        float(os.getenv("LLM_RETRY_MAX_DELAY", 8)),
+    )
+
+    return uniform(delay / 2, delay)
+
+
+class RateLimiter:
+    """
+    Rate limiter of a provider model
+
+    Attributes:
+        - name: Name of the limited model
+        - max_retries: Retries of a request after a rate limit or transient
+          error
+    """
+
+    def __init__(
+        self,
+        name: str,
+        rpm: int = 0,
+        tpm: int = 0,
+        max_retries: int = 3,
+    ) -> None:
+        self.name: str = name
+        self.max_retries: int = max_retries
+        self.__requests: Union[TokenBucket, None] = TokenBucket(rpm) if rpm else None
+        self.__tokens: Union[TokenBucket, None] = TokenBucket(tpm) if tpm else None
+        self.__blocked_until: float = 0.0
+        self.__lock: Lock = Lock()
+        self.__waiting: int = 0
+        self.__rate_limited: int = 0
+        self.__waits: Deque[float] = deque(maxlen=1000)
+
+    def reserve(self, tokens: int) -> float:
+        """
+        Reserves capacity for a request
+
+        Args:
+            - tokens: Estimated tokens of the request
+
+        Returns:
+            - Seconds to wait before sending the request
+        """
+        with self.__lock:
+            now: float = monotonic()
+            wait: float = max(self.__blocked_until - now, 0.0)
+            if self.__requests:
+                wait = max(wait, self.__requests.reserve(1, now))
+            if self.__tokens:
+                wait = max(wait, self.__tokens.reserve(tokens, now))
+
+            self.__waits.append(wait)
+            if wait:
+                self.__waiting += 1
+
+        return wait
+
+    def settle(self, reserved: int, used: Union[int, None]) -> None:
+        """
+        Adjusts the token bucket with the tokens actually used
+
+        Args:
+            - reserved: Tokens reserved for the request
+            - used: Tokens reported by the provider, if any
+        """
+        if self.__tokens and used is not None:
+            with self.__lock:
+                self.__tokens.refund(reserved - used)
+
+    def block(self, seconds: float) -> None:
+        """
+        Holds every request for some time, e.g. after a Retry-After response
+
+        Args:
+            - seconds: Seconds to hold requests for
+        """
+        LOGGER.warning(f"{self.name} rate limited, holding requests {seconds}s")
+        with self.__lock:
+            self.__rate_limited += 1
+            self.__blocked_until = max(self.__blocked_until, monotonic() + seconds)
+
+    def __done_waiting(self, wait: float) -> None:
+        """
+        Removes a caller from the queue depth once its wait is over
+
+        Args:
+            - wait: Seconds the caller waited
+        """
+        if wait:
+            with self.__lock:
+                self.__waiting -= 1
+
+    def __retry_delay(
+        self, error: Exception, attempt: int, tokens: int
+    ) -> Union[float, None]:
+        """
+        Prepares the retry of a failed request
+
+        Rate limited requests hold every request to the model for the
+        Retry-After time. Transient errors (timeouts, connection errors, 408,
+        409 and 5xx responses) only delay the failed request
+
+        Args:
+            - error: Error raised by the provider
+            - attempt: Attempt that failed, from 0
+            - tokens: Estimated tokens of the request
+
+        Returns:
+            - Seconds to wait before reserving capacity again, or None if the
+              request must not be retried
+        """
+        if attempt == self.max_retries:
+            return None
+
+        seconds: Union[float, None] = retry_after(error)
+        if seconds is not None:
+            # Rejected requests use no tokens, and the retry reserves again
+            self.settle(tokens, 0)
+            self.block(seconds)
+            return 0.0
+
+        seconds = backoff(error, attempt)
+        if seconds is not None:
+            LOGGER.warning(
+                f"{self.name} request failed, retrying in {seconds:.2f}s: {error}"
+            )
+
+        return seconds
+
+    def call(self, request: Callable[[], Any], tokens: int) -> Any:
+        """
+        Sends a request once capacity is available, retrying rate limited
+        requests and transient errors
+
+        Args:
+            - request: Sends the request
+            - tokens: Estimated tokens of the request
+        """
+        for attempt in range(self.max_retries + 1):
+            wait: float = self.reserve(tokens)
+            sleep(wait)
+            self.__done_waiting(wait)
+            try:
+                response: Any = request()
+            except Exception as error:
+                seconds: Union[float, None] = self.__retry_delay(error, attempt, tokens)
+                if seconds is None:
+                    raise
+                sleep(seconds)
+                continue
+
+            self.settle(tokens, used_tokens(response))
+            return response
+
+    async def acall(self, request: Callable[[], Awaitable[Any]], tokens: int) -> Any:
+        """
+        Async version of call
+
+        Args:
+            - request: Sends the request
+            - tokens: Estimated tokens of the request
+        """
+        for attempt in range(self.max_retries + 1):
+            wait: float = self.reserve(tokens)
+            await asyncio.sleep(wait)
+            self.__done_waiting(wait)
+            try:
+                response: Any = await request()
+            except Exception as error:
+                seconds: Union[float, None] = self.__retry_delay(error, attempt, tokens)
+                if seconds is None:
+                    raise
+                await asyncio.sleep(seconds)
+                continue
+
+            self.settle(tokens, used_tokens(response))
+            return response
+
+    @property
+    def stats(self) -> Dict:
+        """
+        Queue depth, wait times and rate limit errors
+        """
+        with self.__lock:
+            waits = list(self.__waits)
+            return {
+                "queue_depth": self.__waiting,
+                "rate_limited": self.__rate_limited,
+                "requests": len(waits),
+                "wait_p50_ms": round(percentile(waits, 50) * 1000, 3),
+                "wait_p95_ms": round(percentile(waits, 95) * 1000, 3),
+                "wait_max_ms": round(max(waits, default=0.0) * 1000, 3),
+            }
+
+
+def used_tokens(response: Any) -> Union[int, None]:
+    """
+    Tokens reported by the provider for a chat model response
+
+    Args:
+        - response: Chat model response
+    """
+    usage: Union[Dict, None] = getattr(response, "usage_metadata", None)
+    if not usage:
+        return None
+
+    return usage.get("total_tokens")
+
+
+RATE_LIMITERS: Dict[Tuple[Hashable, ...], RateLimiter] = {}
+_LOCK: Lock = Lock()
+
+
+def get_rate_limiter(model: str) -> RateLimiter:
+    """
+    Returns the process-wide rate limiter of a model
+
+    Budgets are read from the model provider config (rpm and tpm). A budget
+    of 0 is not limited.
+
+    Args:
+        - model: Name of the model. See LLMModel enum.
+    """
+    model_config: Dict = model_provider.get(model)
+    key: Tuple[Hashable, ...] = (model_config.get("name"), model)
+    if key in RATE_LIMITERS:
+        return RATE_LIMITERS[key]
+
+    with _LOCK:
+        if key not in RATE_LIMITERS:
+            RATE_LIMITERS[key] = RateLimiter(
+                name=f"{model_config.get('name')}/{model}",
+                rpm=model_config.get("rpm", 0),
+                tpm=model_config.get("tpm", 0),
+                max_retries=int(os.getenv("LLM_RATE_LIMIT_RETRIES", 3)),
+            )
+
+    return RATE_LIMITERS[key]
+
+
+def rate_limiter_stats() -> Dict:
+    """
+    Counters of every rate limiter in use
+    """
+    return {limiter.name: limiter.stats for limiter in RATE_LIMITERS.values()}
@@ -0,0 +1,245 @@
+"""
+Defines execution tracing
+
+Spans are recorded around graph builds, node actions, LLM requests, MongoDB
+commands and checkpoint writes with their wall time, CPU time and payload
+sizes, and exported as a Chrome trace (viewable in Perfetto or
+chrome://tracing). Tracing is off unless started, and spans cost a single
+check when it is off.
+"""
+
+from contextlib import contextmanager
+from functools import wraps
+from threading import Lock, get_ident
+from time import perf_counter, thread_time
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+import asyncio
+import json
+import os
+
+from pymongo import monitoring
+
+
+class Tracer:
+    """
+    Collects spans as Chrome trace events
+    """
+
+    def __init__(self) -> None:
+        self.__events: List[Dict] = []
+        self.__lock: Lock = Lock()
+        self.__origin: float = perf_counter()
+        self.__pid: int = os.getpid()
+
+    def record(
+        self, name: str, category: str, start: float, duration: float, args: Dict
+    ) -> None:
+        """
+        Records a complete span
+
+        Args:
+            - name: Name of the span
+            - category: Category of the span, e.g. node, llm, mongo
+            - start: perf_counter value when the span started
+            - duration: Wall time of the span in seconds
+            - args: Details of the span
+        """
+        event: Dict = {
+            "name": name,
+            "cat": category,
+            "ph": "X",
+            "ts": round((start - self.__origin) * 1e6, 3),
+            "dur": round(duration * 1e6, 3),
+            "pid": self.__pid,
+            "tid": track_id(),
+            "args": args,
+        }
+        with self.__lock:
+            self.__events.append(event)
+
+    def export(self, path: str) -> None:
+        """
+        Writes the spans as a Chrome trace file
+
+        Args:
+            - path: Path of the trace file
+        """
+        with self.__lock:
+            events: List[Dict] = list(self.__events)
+
+        with open(path, "w") as trace:
+            json.dump(
+                {"traceEvents": events, "displayTimeUnit": "ms"}, trace, default=str
+            )
+
+
+TRACER: Optional[Tracer] = None
+
+
+def start_tracing() -> Tracer:
+    """
+    Starts recording spans
+    """
+    global TRACER
+
+    TRACER = Tracer()
+
+    return TRACER
+
+
+def stop_tracing(path: Optional[str] = None) -> None:
+    """
+    Stops recording spans
+
+    Args:
+        - path: Path to export the recorded spans to, if any
+    """
+    global TRACER
+
+    if TRACER and path:
+        TRACER.export(path)
+
+    TRACER = None
+
+
+def tracing_enabled() -> bool:
+    """
+    Whether spans are being recorded
+    """
+    return TRACER is not None
+
+
+def track_id() -> int:
+    """
+    Identifier of the current execution track: the asyncio task if any,
+    otherwise the thread, so concurrent runs get their own rows
+    """
+    try:
+        task: Optional[asyncio.Task] = asyncio.current_task()
+    except RuntimeError:
+        task = None
+
+    return id(task) if task else get_ident()
+
+
+def payload_size(payload: Any) -> int:
+    """
+    Size in bytes of a payload serialized as JSON
+
+    Args:
+        - payload: Payload to measure
+    """
+    return len(json.dumps(payload, default=str))
+
+
+@contextmanager
+def span(name: str, category: str, **args: Any) -> Iterator[Dict]:
+    """
+    Records the wall and CPU time of a block
+
+    Args:
+        - name: Name of the span
+        - category: Category of the span
+        - args: Details of the span
+
+    Yields:
+        - The span details, so the block can add more (e.g. response sizes)
+    """
+    tracer: Optional[Tracer] = TRACER
+    if tracer is None:
+        yield args
+        return
+
+    start: float = perf_counter()
+    cpu: float = thread_time()
+    try:
+        yield args
+    finally:
+        # CPU time is per thread, so it includes other tasks on the same loop
+        args["cpu_ms"] = round((thread_time() - cpu) * 1000, 3)
+        tracer.record(name, category, start, perf_counter() - start, args)
+
+
+def traced(action: Callable[[Any], Any], name: str) -> Callable[[Any], Any]:
+    """
+    Wraps a node action in a span with its state and output sizes
+
+    Args:
+        - action: Node action
+        - name: Name of the span
+    """
+
+    @wraps(action)
+    def wrapper(state: Any) -> Any:
+        if not tracing_enabled():
+            return action(state)
+
+        with span(name, "node", input_bytes=payload_size(state)) as args:
+            output: Any = action(state)
+            args["output_bytes"] = payload_size(output)
+
+            return output
+
+    return wrapper
+
+
+def atraced(
+    action: Callable[[Any], Awaitable[Any]], name: str
+) -> Callable[[Any], Awaitable[Any]]:
+    """
+    Async version of traced
+
+    Args:
+        - action: Async node action
+        - name: Name of the span
+    """
+
+    @wraps(action)
+    async def wrapper(state: Any) -> Any:
+        if not tracing_enabled():
+            return await action(state)
+
+        with span(name, "node", input_bytes=payload_size(state)) as args:
+            output: Any = await action(state)
+            args["output_bytes"] = payload_size(output)
+
+            return output
+
+    return wrapper
+
+
+class MongoCommandTracer(monitoring.CommandListener):
+    """
+    Records a span for every MongoDB command while tracing is enabled
+    """
+
+    def started(self, event: monitoring.CommandStartedEvent) -> None:
+        pass
+
+    def succeeded(self, event: monitoring.CommandSucceededEvent) -> None:
+        tracer: Optional[Tracer] = TRACER
+        if tracer is None:
+            return
+
+        duration: float = event.duration_micros / 1e6
+        tracer.record(
+            f"mongo.{event.command_name}",
+            "mongo",
+            perf_counter() - duration,
+            duration,
+            {"database": event.database_name, "reply_bytes": payload_size(event.reply)},
+        )
+
+    def failed(self, event: monitoring.CommandFailedEvent) -> None:
+        tracer: Optional[Tracer] = TRACER
+        if tracer is None:
+            return
+
+        duration: float = event.duration_micros / 1e6
+        tracer.record(
+            f"mongo.{event.command_name}",
+            "mongo",
+            perf_counter() - duration,
+            duration,
+            {"database": event.database_name, "failure": str(event.failure)},
+        )